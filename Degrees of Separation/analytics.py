@@ -0,0 +1,122 @@
+"""
+Degree of separation statistics for the whole actor graph.
+
+With --source, streams the distance of every person reachable from
+one person (their "Bacon number") as CSV and ends with a histogram.
+With --sample N, runs a full search from N random people spread over
+a process pool and estimates the average degree of separation and the
+diameter of the graph from them. Only a histogram per source is kept,
+so memory does not grow with the number of sources.
+
+Usage: python analytics.py [--source PERSON] [--sample N] [--seed S]
+                           [--workers N] [--backend {dict,csr}] [--cache]
+                           directory
+"""
+
+import argparse
+import json
+import random
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import degrees
+from batch import resolve
+
+
+def distance_histogram(source):
+    """
+    Returns source and a Counter of how many people are
+    at each distance from it. Runs in the worker processes.
+    """
+    return source, Counter(dict(enumerate(degrees.level_sizes(source))))
+
+
+def stream_distances(source, out):
+    """
+    Write person_id,distance for everyone reachable from source
+    and return the histogram of distances.
+    """
+    histogram = Counter()
+    out.write("person_id,distance\n")
+    for personId, distance in degrees.distances_from(source):
+        out.write(f"{personId},{distance}\n")
+        histogram[distance] += 1
+    return histogram
+
+
+def sample_all_pairs(sources, out, workers=None, initializer=None, initargs=()):
+    """
+    Search from every one of sources in a process pool, writing one
+    JSON line per finished source to out, and return the estimates.
+
+    The average is taken over every reachable (source, person) pair
+    other than the source itself. The diameter estimate is the largest
+    distance any sample reached, so it is a lower bound of the real one.
+    """
+    total = Counter()
+    diameter = 0
+    with ProcessPoolExecutor(workers, initializer=initializer,
+                             initargs=initargs) as executor:
+        futures = [executor.submit(distance_histogram, source) for source in sources]
+        for future in as_completed(futures):
+            source, histogram = future.result()
+            eccentricity = max(histogram)
+            diameter = max(diameter, eccentricity)
+            total.update(histogram)
+            out.write(json.dumps({
+                "source": source,
+                "reachable": sum(histogram.values()) - 1,
+                "eccentricity": eccentricity,
+                "histogram": {str(d): histogram[d] for d in sorted(histogram)}
+            }) + "\n")
+            out.flush()
+
+    # Distance 0 is every source reaching itself.
+    del total[0]
+    pairs = sum(total.values())
+    average = sum(d * count for d, count in total.items()) / pairs if pairs else None
+    return {"sources": len(sources), "pairs": pairs,
+            "average": average, "diameter_lower_bound": diameter,
+            "histogram": {str(d): total[d] for d in sorted(total)}}
+
+
+def main():
+    argParser = argparse.ArgumentParser()
+    argParser.add_argument("directory")
+    argParser.add_argument("--source", help="id or name of one person")
+    argParser.add_argument("--sample", type=int, help="number of random sources")
+    argParser.add_argument("--seed", type=int, default=0)
+    argParser.add_argument("--workers", type=int, default=None)
+    argParser.add_argument("--backend", choices=("dict", "csr"), default="dict")
+    argParser.add_argument("--cache", action="store_true")
+    args = argParser.parse_args()
+    if (args.source is None) == (args.sample is None):
+        sys.exit("Give exactly one of --source and --sample")
+    if args.cache and args.backend != "csr":
+        sys.exit("--cache needs --backend csr")
+
+    loadArgs = (args.directory, False, args.backend, args.cache)
+    degrees.load_data(*loadArgs)
+
+    if args.source is not None:
+        source, error = resolve(args.source)
+        if error is not None:
+            sys.exit(error)
+        histogram = stream_distances(source, sys.stdout)
+        for distance in sorted(histogram):
+            print(f"{distance}: {histogram[distance]}", file=sys.stderr)
+        return
+
+    random.seed(args.seed)
+    actors = sorted(degrees.starring_people())
+    sources = random.sample(actors, min(args.sample, len(actors)))
+
+    initializer = degrees.worker_initializer()
+    summary = sample_all_pairs(sources, sys.stdout, args.workers,
+                               initializer, loadArgs)
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Answers many pairs of people in one process.
+
+The pairs file is a CSV file with one pair per row, each person
+given by IMDB id or by name. Pairs are grouped by source, every
+distinct source is searched once for all of its targets, and the
+sources are spread over a process pool. Results are written one
+line at a time as they become available, as CSV or JSON lines.
+
+Usage: python batch.py [--format {csv,jsonl}] [--output FILE]
+                       [--workers N] [--backend {dict,csr}] [--cache]
+                       directory pairs
+"""
+
+import argparse
+import csv
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import degrees
+
+
+def read_pairs(filename):
+    """
+    Returns (line, source, target) for every pair in filename.
+    A first row of "source,target" is treated as a header.
+    """
+    pairs = []
+    with open(filename, encoding="utf-8", newline="") as f:
+        for line, row in enumerate(csv.reader(f), start=1):
+            if not row or (line == 1 and [x.lower() for x in row] == ["source", "target"]):
+                continue
+            if len(row) != 2:
+                raise ValueError(f"Line {line}: expected two people, got {len(row)}")
+            pairs.append((line, row[0].strip(), row[1].strip()))
+    return pairs
+
+
+def resolve(person):
+    """
+    Returns (person_id, None) for an id or a name, and (None, error
+    message) if nobody matches. Names shared by several people go to
+    the one ranked first by degrees.rank_people.
+    """
+    if degrees.person_exists(person):
+        return person, None
+    person_ids = degrees.rank_people(degrees.ids_for_name(person))
+    if len(person_ids) == 0:
+        suggestions = [degrees.person_name(person_id)
+                       for person_id, _ in degrees.find_people(person, 3)]
+        if suggestions:
+            return None, f"'{person}' not found, did you mean: {', '.join(suggestions)}"
+        return None, f"'{person}' not found"
+    return person_ids[0], None
+
+
+def answer_source(source, targets):
+    """
+    Returns the shortest paths from source to every one of targets.
+    Runs in the worker processes.
+    """
+    return source, degrees.shortest_paths_from(source, targets)
+
+
+def run(pairs, writer, workers=None, initializer=None, initargs=()):
+    """
+    Answer every (line, source, target) of pairs and pass each
+    result to writer, grouping the searches by source.
+    """
+    bySource = dict()
+    for line, source, target in pairs:
+        sourceId, error = resolve(source)
+        targetId = None
+        if error is None:
+            targetId, error = resolve(target)
+        if error is not None:
+            writer(dict(line=line, source=source, target=target, error=error))
+            continue
+        bySource.setdefault(sourceId, []).append((line, source, target, targetId))
+
+    with ProcessPoolExecutor(workers, initializer=initializer,
+                             initargs=initargs) as executor:
+        futures = [executor.submit(answer_source, sourceId,
+                                   sorted({query[3] for query in queries}))
+                   for sourceId, queries in bySource.items()]
+        for future in as_completed(futures):
+            sourceId, paths = future.result()
+            for line, source, target, targetId in bySource[sourceId]:
+                path = paths[targetId]
+                writer(dict(
+                    line=line, source=source, target=target,
+                    source_id=sourceId, target_id=targetId,
+                    degrees=None if path is None else len(path),
+                    path=None if path is None else [list(step) for step in path]))
+
+
+def jsonl_writer(out):
+    def write(result):
+        out.write(json.dumps(result) + "\n")
+        out.flush()
+    return write
+
+
+def csv_writer(out):
+    """
+    Writes results as CSV rows, with the path as movie_id:person_id
+    steps separated by semicolons.
+    """
+    fields = ["line", "source", "target", "source_id", "target_id",
+              "degrees", "path", "error"]
+    rows = csv.DictWriter(out, fields)
+    rows.writeheader()
+
+    def write(result):
+        result = dict(result)
+        if result.get("path") is not None:
+            result["path"] = ";".join(f"{movieId}:{personId}"
+                                      for movieId, personId in result["path"])
+        rows.writerow(result)
+        out.flush()
+    return write
+
+
+def main():
+    argParser = argparse.ArgumentParser()
+    argParser.add_argument("directory")
+    argParser.add_argument("pairs", help="CSV file of source,target pairs")
+    argParser.add_argument("--format", choices=("csv", "jsonl"), default="csv")
+    argParser.add_argument("--output", help="write here instead of stdout")
+    argParser.add_argument("--workers", type=int, default=None,
+                           help="number of processes, one per core by default")
+    argParser.add_argument("--backend", choices=("dict", "csr"), default="dict")
+    argParser.add_argument("--cache", action="store_true")
+    args = argParser.parse_args()
+    if args.cache and args.backend != "csr":
+        sys.exit("--cache needs --backend csr")
+
+    loadArgs = (args.directory, False, args.backend, args.cache)
+    degrees.load_data(*loadArgs)
+
+    initializer = degrees.worker_initializer()
+
+    out = sys.stdout if args.output is None else open(
+        args.output, "w", encoding="utf-8", newline="")
+    try:
+        writer = jsonl_writer(out) if args.format == "jsonl" else csv_writer(out)
+        run(read_pairs(args.pairs), writer, args.workers, initializer, loadArgs)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
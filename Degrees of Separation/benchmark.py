@@ -0,0 +1,196 @@
+"""
+Compares the one-sided and the bidirectional search of degrees.py
+on randomly drawn pairs of people. With --load, compares the load
+time and peak memory of the graph backends instead, and with --lean
+the Node based search with the lean shortest_path. --check loads the
+people and movies of directory with an empty stars.csv through every
+backend.
+
+Usage: python benchmark.py [directory] [--pairs N] [--seed S]
+                           [--backend {dict,csr}] [--load] [--lean]
+                           [--check]
+"""
+
+import argparse
+import csv
+import multiprocessing
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import degrees
+
+# Pairs of a person with themselves added to the random pairs
+SELF_PAIRS = 5
+
+
+def run_search(search, pairs):
+    """
+    Runs search on every pair and returns the lists of
+    path lengths, expanded people and wall times.
+    """
+    lengths = []
+    expanded = []
+    times = []
+    for source, target in pairs:
+        stats = {}
+        start = time.perf_counter()
+        path = search(source, target, stats)
+        times.append(time.perf_counter() - start)
+        lengths.append(None if path is None else len(path))
+        expanded.append(stats["expanded"])
+    return lengths, expanded, times
+
+
+def measure_load(directory, backend):
+    """
+    Returns the load time and peak memory of backend.
+    Meant to run in a fresh process so that the peaks do not mix.
+    """
+    start = time.perf_counter()
+    degrees.load_data(directory, False, backend)
+    return time.perf_counter() - start, degrees.peak_memory()
+
+
+def compare_load(directory):
+    for backend in ("dict", "csr"):
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(1, mp_context=context) as executor:
+            seconds, peak = executor.submit(measure_load, directory, backend).result()
+        peak = "unknown" if peak is None else f"{peak:.1f} MiB"
+        print(f"{backend}: loaded in {seconds:.2f} s, peak memory {peak}")
+
+
+def check_empty_stars(directory):
+    """
+    Loads the people and movies of directory with a stars.csv of only
+    a header with every backend, the csr one also from its snapshot,
+    and checks that nobody has starred in anything or is connected.
+    """
+    with tempfile.TemporaryDirectory() as empty:
+        for name in ("people.csv", "movies.csv"):
+            shutil.copy(os.path.join(directory, name), empty)
+        with open(os.path.join(empty, "stars.csv"), "w") as f:
+            f.write("person_id,movie_id\n")
+
+        with open(os.path.join(directory, "people.csv"), encoding="utf-8") as f:
+            source = next(csv.DictReader(f))["id"]
+
+        # The second cached load reads the snapshot the first one saved.
+        loads = (("dict", False, "dict"), ("csr", False, "csr"),
+                 ("csr", True, "csr saving a snapshot"), ("csr", True, "csr from the snapshot"))
+        for backend, cache, name in loads:
+            degrees.load_data(empty, False, backend, cache)
+            if degrees.starring_people():
+                raise Exception(f"{name}: people starred without stars")
+            if degrees.shortest_path(source, source) is not None:
+                raise Exception(f"{name}: a path without stars")
+            print(f"{name}: loaded an empty stars.csv.")
+
+
+def measure_allocations(search, pairs):
+    """
+    Returns the peak of memory allocated during each search on pairs.
+    """
+    peaks = []
+    tracemalloc.start()
+    for source, target in pairs:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        search(source, target)
+        peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    tracemalloc.stop()
+    return peaks
+
+
+def compare_lean(pairs):
+    """
+    Compares time and allocations per query of
+    shortest_path_nodes and shortest_path.
+    """
+    searches = (("Node based", degrees.shortest_path_nodes),
+                ("Lean", degrees.shortest_path))
+    results = {}
+    for name, search in searches:
+        lengths, _, times = run_search(search, pairs)
+        results[name] = lengths
+        peaks = measure_allocations(search, pairs)
+        print(f"{name}:")
+        print(f"  time per query mean {1000 * statistics.mean(times):.3f} ms, "
+              f"median {1000 * statistics.median(times):.3f} ms")
+        print(f"  peak allocated per query mean {statistics.mean(peaks) / 2**10:.1f} KiB, "
+              f"max {max(peaks) / 2**10:.1f} KiB")
+    if len(set(map(tuple, results.values()))) != 1:
+        raise Exception("Searches disagree on path lengths")
+
+
+def report(name, expanded, times):
+    print(f"{name}:")
+    print(f"  expanded total {sum(expanded)}, "
+          f"median {statistics.median(expanded)}, max {max(expanded)}")
+    print(f"  time total {sum(times):.3f} s, "
+          f"median {1000 * statistics.median(times):.3f} ms, "
+          f"max {1000 * max(times):.3f} ms")
+
+
+def main():
+    argParser = argparse.ArgumentParser()
+    argParser.add_argument("directory", nargs="?", default="large")
+    argParser.add_argument("--pairs", type=int, default=200)
+    argParser.add_argument("--seed", type=int, default=0)
+    argParser.add_argument("--backend", choices=("dict", "csr"), default="dict")
+    argParser.add_argument("--load", action="store_true",
+                           help="compare loading with both backends")
+    argParser.add_argument("--lean", action="store_true",
+                           help="compare the Node based and the lean search")
+    argParser.add_argument("--check", action="store_true",
+                           help="load an empty stars.csv with every backend")
+    args = argParser.parse_args()
+
+    if args.check:
+        check_empty_stars(args.directory)
+        return
+
+    if args.load:
+        compare_load(args.directory)
+        return
+
+    degrees.load_data(args.directory, True, args.backend)
+
+    # Only people who starred in something can be connected at all.
+    random.seed(args.seed)
+    actors = sorted(degrees.starring_people())
+    pairs = []
+    while len(pairs) < args.pairs:
+        source, target = random.choice(actors), random.choice(actors)
+        if source != target:
+            pairs.append((source, target))
+    # Searches from a person to themselves must agree too.
+    pairs += [(source, source) for source, _ in pairs[:SELF_PAIRS]]
+
+    if args.lean:
+        compare_lean(pairs)
+        return
+
+    oneLengths, oneExpanded, oneTimes = run_search(degrees.shortest_path, pairs)
+    biLengths, biExpanded, biTimes = run_search(
+        degrees.shortest_path_bidirectional, pairs)
+
+    if oneLengths != biLengths:
+        raise Exception("Searches disagree on path lengths")
+
+    connected = sum(length is not None for length in oneLengths)
+    print(f"{len(pairs)} pairs, {connected} connected.")
+    report("One-sided", oneExpanded, oneTimes)
+    report("Bidirectional", biExpanded, biTimes)
+    print(f"Speedup {sum(oneTimes) / sum(biTimes):.1f}x, "
+          f"{sum(oneExpanded) / max(1, sum(biExpanded)):.1f}x fewer expansions.")
+
+
+if __name__ == "__main__":
+    main()
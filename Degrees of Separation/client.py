@@ -0,0 +1,65 @@
+"""
+Command line client for server.py.
+
+Usage: python client.py [--host HOST] [--port PORT] [--socket PATH]
+                        (SOURCE TARGET | --stats)
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from urllib.parse import urlencode
+
+
+async def fetch(path, host="127.0.0.1", port=8310, socket=None):
+    """
+    Sends GET path to the server and returns the status and decoded JSON body.
+    """
+    if socket is not None:
+        reader, writer = await asyncio.open_unix_connection(socket)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n"
+                     f"Connection: close\r\n\r\n".encode("latin-1"))
+        await writer.drain()
+        status = int((await reader.readline()).split(b" ", 2)[1])
+        length = None
+        while True:
+            header = await reader.readline()
+            if header in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = header.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        body = await (reader.read() if length is None else reader.readexactly(length))
+    finally:
+        writer.close()
+    return status, json.loads(body)
+
+
+def path_query(source, target):
+    return "/path?" + urlencode({"source": source, "target": target})
+
+
+def main():
+    argParser = argparse.ArgumentParser()
+    argParser.add_argument("people", nargs="*", help="source and target")
+    argParser.add_argument("--host", default="127.0.0.1")
+    argParser.add_argument("--port", type=int, default=8310)
+    argParser.add_argument("--socket")
+    argParser.add_argument("--stats", action="store_true")
+    args = argParser.parse_args()
+    if args.stats == (len(args.people) == 2) or len(args.people) not in (0, 2):
+        sys.exit("Give a source and a target, or --stats")
+
+    path = "/stats" if args.stats else path_query(*args.people)
+    status, body = asyncio.run(fetch(path, args.host, args.port, args.socket))
+    print(json.dumps(body, indent=2))
+    if status != 200:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,510 @@
+"""
+Compact graph backend for degrees.py.
+
+Person and movie ids are remapped to dense integers and the bipartite
+person-movie adjacency is stored as NumPy CSR arrays: the movies of
+person p are person_movies[person_offsets[p]:person_offsets[p + 1]]
+and the people of movie m are
+movie_people[movie_offsets[m]:movie_offsets[m + 1]].
+"""
+
+import csv
+import io
+import time
+from array import array
+
+import numpy as np
+
+# Bytes of stars.csv parsed at a time by read_stars_chunked
+CHUNK_BYTES = 1 << 23
+
+
+class CSRGraph:
+
+    def __init__(self, person_ids, names, births, movie_ids, titles, years,
+                 person_offsets, person_movies, movie_offsets, movie_people,
+                 components=None):
+        """
+        Each of person_ids, names and births (movie_ids, titles and
+        years) holds one string per person (movie) index.
+        components labels every person index with its connected
+        component and is computed here when not given.
+        """
+        self.person_ids = person_ids
+        self.names = names
+        self.births = births
+        self.movie_ids = movie_ids
+        self.titles = titles
+        self.years = years
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_people = movie_people
+        if components is None:
+            components = component_labels(person_offsets, movie_offsets, movie_people)
+        self.components = components
+
+        # Anything with a dict-like get(). Built on first use
+        # unless the loader provides them, see person_index().
+        self._person_lookup = None
+        self._movie_lookup = None
+        self._name_lookup = None
+
+    @classmethod
+    def from_csv(cls, directory, stats=None):
+        """
+        Parse people.csv, movies.csv and stars.csv of directory.
+        If a stats dictionary is given, the number of star rows and
+        the seconds spent reading them are stored in it.
+        """
+        person_ids, names, births = _read_columns(
+            f"{directory}/people.csv", ("id", "name", "birth"))
+        movie_ids, titles, years = _read_columns(
+            f"{directory}/movies.csv", ("id", "title", "year"))
+        person_lookup = {person_id: i for i, person_id in enumerate(person_ids)}
+        movie_lookup = {movie_id: i for i, movie_id in enumerate(movie_ids)}
+
+        startTime = time.perf_counter()
+        person_numbers = _NumberIndex.build(person_ids)
+        movie_numbers = _NumberIndex.build(movie_ids)
+        chunked = None
+        if person_numbers is not None and movie_numbers is not None:
+            # Files the chunked parser cannot read are read row by row.
+            try:
+                chunked = read_stars_chunked(
+                    f"{directory}/stars.csv", person_numbers, movie_numbers)
+            except ValueError:
+                pass
+        if chunked is not None:
+            edge_people, edge_movies, rows = chunked
+        else:
+            edge_people, edge_movies, rows = read_stars(
+                f"{directory}/stars.csv", person_lookup, movie_lookup)
+        if stats is not None:
+            stats["star_rows"] = rows
+            stats["star_seconds"] = time.perf_counter() - startTime
+
+        person_offsets, person_movies, movie_offsets, movie_people = build_csr(
+            edge_people, edge_movies, len(person_ids), len(movie_ids))
+
+        graph = cls(person_ids, names, births, movie_ids, titles, years,
+                    person_offsets, person_movies, movie_offsets, movie_people)
+        graph._person_lookup = person_lookup
+        graph._movie_lookup = movie_lookup
+        return graph
+
+    @property
+    def nbytes(self):
+        """
+        Returns the number of bytes taken by the adjacency arrays.
+        """
+        return (self.person_offsets.nbytes + self.person_movies.nbytes +
+                self.movie_offsets.nbytes + self.movie_people.nbytes +
+                self.components.nbytes)
+
+    def person_index(self, person_id):
+        """
+        Returns the dense index of person_id, or None if it is unknown.
+        """
+        if self._person_lookup is None:
+            self._person_lookup = {
+                person_id: i for i, person_id in enumerate(self.person_ids)}
+        return self._person_lookup.get(person_id)
+
+    def movie_index(self, movie_id):
+        """
+        Returns the dense index of movie_id, or None if it is unknown.
+        """
+        if self._movie_lookup is None:
+            self._movie_lookup = {
+                movie_id: i for i, movie_id in enumerate(self.movie_ids)}
+        return self._movie_lookup.get(movie_id)
+
+    def ids_for_name(self, name):
+        """
+        Returns the set of person_ids whose name matches name, ignoring case.
+        """
+        if self._name_lookup is None:
+            self._name_lookup = {}
+            for i, personName in enumerate(self.names):
+                self._name_lookup.setdefault(personName.lower(), []).append(i)
+        return {self.person_ids[i] for i in self._name_lookup.get(name.lower(), [])}
+
+    def connected(self, source, target):
+        """
+        Returns True if source and target are in the same connected component.
+        """
+        return (self.components[self.person_index(source)] ==
+                self.components[self.person_index(target)])
+
+    def movie_count(self, person_id):
+        person = self.person_index(person_id)
+        return int(self.person_offsets[person + 1] - self.person_offsets[person])
+
+    def person_name(self, person_id):
+        return self.names[self.person_index(person_id)]
+
+    def person_birth(self, person_id):
+        return self.births[self.person_index(person_id)]
+
+    def movie_title(self, movie_id):
+        return self.titles[self.movie_index(movie_id)]
+
+    def starring_people(self):
+        """
+        Returns the person_ids of everyone who starred in at least one movie.
+        """
+        counts = np.diff(self.person_offsets)
+        return [self.person_ids[i] for i in np.flatnonzero(counts)]
+
+    def movies_of(self, person):
+        return self.person_movies[self.person_offsets[person]:self.person_offsets[person + 1]]
+
+    def people_of(self, movie):
+        return self.movie_people[self.movie_offsets[movie]:self.movie_offsets[movie + 1]]
+
+    def neighbors(self, person_id):
+        """
+        Returns (movie_id, person_id) pairs for people who starred
+        with a given person, like degrees.neighbors_for_person.
+        """
+        neighbors = set()
+        for movie in self.movies_of(self.person_index(person_id)).tolist():
+            movie_id = self.movie_ids[movie]
+            for person in self.people_of(movie).tolist():
+                neighbors.add((movie_id, self.person_ids[person]))
+        return neighbors
+
+    def shortest_path(self, source, target, stats=None):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs
+        that connect the source to the target, or None.
+
+        The search is breadth first over whole levels at a time, with the
+        movies and people of each level gathered by vectorized CSR lookups.
+        """
+        source = self.person_index(source)
+        target = self.person_index(target)
+
+        # Like degrees.shortest_path, a person is one degree away from
+        # themselves when they have starred in anything.
+        if source == target:
+            if stats is not None:
+                stats["expanded"] = 1
+            movies = self.movies_of(source)
+            if len(movies) == 0:
+                return None
+            return [(self.movie_ids[movies[0]], self.person_ids[source])]
+        if self.components[source] != self.components[target]:
+            if stats is not None:
+                stats["expanded"] = 0
+            return None
+
+        parent_person, parent_movie, expanded = self._search(source, [target])
+        if stats is not None:
+            stats["expanded"] = expanded
+        return self._path(parent_person, parent_movie, source, target)
+
+    def shortest_paths_from(self, source, targets):
+        """
+        Returns a dictionary that maps each of targets to its shortest
+        path from source, or None, all found with one search.
+        """
+        sourceIndex = self.person_index(source)
+        indices = {target: self.person_index(target) for target in targets}
+        # People in other components can never be reached.
+        component = self.components[sourceIndex]
+        parent_person, parent_movie, _ = self._search(
+            sourceIndex, [i for i in indices.values()
+                          if i != sourceIndex and self.components[i] == component])
+
+        paths = {}
+        for target, index in indices.items():
+            if index == sourceIndex:
+                paths[target] = self.shortest_path(source, target)
+            else:
+                paths[target] = self._path(parent_person, parent_movie, sourceIndex, index)
+        return paths
+
+    def _search(self, source, targets):
+        """
+        Breadth first search from source until every one of targets
+        is reached or nothing is left. Returns the parent person and
+        parent movie of every reached person, -1 for the rest, and
+        the number of people expanded.
+        """
+        parent_person, parent_movie, movie_parent = self._parent_arrays(source)
+        frontier = np.array([source], dtype=np.int32)
+        targets = np.array(targets, dtype=np.int32)
+        expanded = 0
+
+        while len(frontier) > 0 and np.any(parent_person[targets] == -1):
+            expanded += len(frontier)
+            frontier = self._expand(frontier, parent_person, parent_movie, movie_parent)
+
+        return parent_person, parent_movie, expanded
+
+    def levels(self, source):
+        """
+        Yields the array of person indices at each distance from
+        the person index source, starting with source itself.
+        """
+        parent_person, parent_movie, movie_parent = self._parent_arrays(source)
+        frontier = np.array([source], dtype=np.int32)
+        while len(frontier) > 0:
+            yield frontier
+            frontier = self._expand(frontier, parent_person, parent_movie, movie_parent)
+
+    def distances_from(self, source):
+        """
+        Yields (person_id, distance) for every person reachable
+        from source, in order of distance.
+        """
+        for distance, level in enumerate(self.levels(self.person_index(source))):
+            for person in level.tolist():
+                yield self.person_ids[person], distance
+
+    def _parent_arrays(self, source):
+        parent_person = np.full(len(self.person_offsets) - 1, -1, dtype=np.int32)
+        parent_movie = np.full(len(self.person_offsets) - 1, -1, dtype=np.int32)
+        movie_parent = np.full(len(self.movie_offsets) - 1, -1, dtype=np.int32)
+        parent_person[source] = source
+        return parent_person, parent_movie, movie_parent
+
+    def _expand(self, frontier, parent_person, parent_movie, movie_parent):
+        """
+        Returns the people reached for the first time from frontier,
+        filling in the parent arrays for them and their movies.
+        """
+        # Movies of the frontier that no earlier level has used.
+        movies, via_people = gather(self.person_offsets, self.person_movies, frontier)
+        fresh = movie_parent[movies] == -1
+        movies, first = np.unique(movies[fresh], return_index=True)
+        movie_parent[movies] = via_people[fresh][first]
+
+        # People of those movies that have not been reached yet.
+        people, via_movies = gather(self.movie_offsets, self.movie_people, movies)
+        fresh = parent_person[people] == -1
+        people, first = np.unique(people[fresh], return_index=True)
+        via_movies = via_movies[fresh][first]
+        parent_movie[people] = via_movies
+        parent_person[people] = movie_parent[via_movies]
+        return people
+
+    def _path(self, parent_person, parent_movie, source, target):
+        if parent_person[target] == -1:
+            return None
+        path_ = list()
+        person = target
+        while person != source:
+            path_.append((self.movie_ids[parent_movie[person]], self.person_ids[person]))
+            person = parent_person[person]
+        path_.reverse()
+        return path_
+
+
+def read_stars(filename, person_lookup, movie_lookup):
+    """
+    Returns the person and movie indices of every row of stars.csv
+    as int32 arrays, and the number of rows, reading row by row.
+    """
+    # Typed arrays instead of lists keep the edge list at
+    # four bytes per entry while it is being read.
+    edge_people = array("i")
+    edge_movies = array("i")
+    rows = 0
+    with open(filename, encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        person_column = header.index("person_id")
+        movie_column = header.index("movie_id")
+        for row in reader:
+            rows += 1
+            # Rows referring to unknown people or movies are skipped,
+            # as in degrees.load_data.
+            person = person_lookup.get(row[person_column])
+            movie = movie_lookup.get(row[movie_column])
+            if person is not None and movie is not None:
+                edge_people.append(person)
+                edge_movies.append(movie)
+    return (np.frombuffer(edge_people, dtype=np.int32),
+            np.frombuffer(edge_movies, dtype=np.int32), rows)
+
+
+def read_stars_chunked(filename, person_numbers, movie_numbers,
+                       chunk_bytes=CHUNK_BYTES):
+    """
+    Like read_stars, but parses chunk_bytes of the file at a time into
+    integer arrays with NumPy and maps them to indices with
+    person_numbers and movie_numbers, so nothing is built per row.
+    Needs a file of two unquoted integer columns.
+    """
+    with open(filename, "rb") as f:
+        header = f.readline().decode("utf-8").strip().split(",")
+        if sorted(header) != ["movie_id", "person_id"]:
+            raise ValueError(f"Unexpected header in {filename}: {header}")
+        person_column = header.index("person_id")
+
+        people_chunks = []
+        movie_chunks = []
+        rows = 0
+        rest = b""
+        while True:
+            chunk = f.read(chunk_bytes)
+            if not chunk:
+                chunk, rest = rest, b""
+            else:
+                # Whole lines only, the tail is kept for the next chunk.
+                chunk = rest + chunk
+                end = chunk.rfind(b"\n") + 1
+                chunk, rest = chunk[:end], chunk[end:]
+            chunk = chunk.replace(b"\r", b"").strip()
+            if not chunk:
+                if rest:
+                    continue
+                break
+
+            # loadtxt raises ValueError on anything but integers,
+            # quoted ids for one, and on rows of other lengths.
+            numbers = np.loadtxt(io.BytesIO(chunk), dtype=np.int64,
+                                 delimiter=",", ndmin=2)
+            if numbers.shape[1] != 2:
+                raise ValueError(f"Could not parse {filename} as two integer columns")
+            lines = len(numbers)
+            people = person_numbers.lookup(numbers[:, person_column])
+            movies = movie_numbers.lookup(numbers[:, 1 - person_column])
+            known = (people >= 0) & (movies >= 0)
+            people_chunks.append(people[known])
+            movie_chunks.append(movies[known])
+            rows += lines
+
+    return (np.concatenate(people_chunks or [np.zeros(0, np.int32)]),
+            np.concatenate(movie_chunks or [np.zeros(0, np.int32)]), rows)
+
+
+class _NumberIndex:
+    """
+    Maps integer ids to dense indices with a binary search over the
+    sorted ids, for read_stars_chunked.
+    """
+
+    def __init__(self, numbers):
+        self.order = np.argsort(numbers, kind="stable").astype(np.int32)
+        self.sorted = numbers[self.order]
+
+    @classmethod
+    def build(cls, ids):
+        """
+        Returns an index of ids, or None unless every id is written
+        as a plain integer, so that parsing cannot change it.
+        """
+        try:
+            numbers = np.array([int(x) for x in ids], dtype=np.int64)
+        except ValueError:
+            return None
+        if any(str(number) != x for number, x in zip(numbers.tolist(), ids)):
+            return None
+        return cls(numbers)
+
+    def lookup(self, numbers):
+        """
+        Returns the index of every one of numbers, -1 for unknown ones.
+        """
+        if len(self.sorted) == 0:
+            return np.full(len(numbers), -1, dtype=np.int32)
+        positions = np.searchsorted(self.sorted, numbers)
+        positions = np.minimum(positions, len(self.sorted) - 1)
+        found = self.sorted[positions] == numbers
+        return np.where(found, self.order[positions], -1).astype(np.int32)
+
+
+def build_csr(edge_people, edge_movies, person_count, movie_count):
+    """
+    Returns person_offsets, person_movies, movie_offsets and movie_people
+    for the given person-movie edge list. Repeated edges are dropped.
+    """
+    keys = np.sort(edge_people.astype(np.int64) * movie_count + edge_movies)
+    # A stars.csv without rows gives every person and movie an empty list.
+    if len(keys) == 0 or movie_count == 0:
+        empty = np.zeros(0, dtype=np.int32)
+        return (np.zeros(person_count + 1, dtype=np.int64), empty,
+                np.zeros(movie_count + 1, dtype=np.int64), empty)
+    mask = np.ones(len(keys), dtype=bool)
+    mask[1:] = keys[1:] != keys[:-1]
+    keys = keys[mask]
+    edge_people = (keys // movie_count).astype(np.int32)
+    edge_movies = (keys % movie_count).astype(np.int32)
+
+    # Keys are sorted by person already, the movie side needs a sort.
+    person_offsets = _offsets(edge_people, person_count)
+    order = np.argsort(edge_movies, kind="stable")
+    movie_offsets = _offsets(edge_movies, movie_count)
+    return person_offsets, edge_movies, movie_offsets, edge_people[order]
+
+
+def component_labels(person_offsets, movie_offsets, movie_people):
+    """
+    Returns the connected component label of every person, the
+    smallest person index in the component.
+
+    This is union-find on arrays: every star of a movie is joined with
+    the movie's first star by hooking the larger root under the smaller
+    one for all links at once, followed by pointer jumping until every
+    person points straight at a root, repeated until no link joins two
+    different roots.
+    """
+    parent = np.arange(len(person_offsets) - 1, dtype=np.int32)
+    counts = np.diff(movie_offsets)
+    first = np.repeat(movie_people[movie_offsets[:-1][counts > 0]], counts[counts > 0])
+    a, b = first, movie_people
+
+    while True:
+        rootA = parent[a]
+        rootB = parent[b]
+        differ = rootA != rootB
+        if not np.any(differ):
+            return parent
+        low = np.minimum(rootA[differ], rootB[differ])
+        high = np.maximum(rootA[differ], rootB[differ])
+        np.minimum.at(parent, high, low)
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+
+
+def gather(offsets, indices, nodes):
+    """
+    Returns the concatenated adjacency lists of nodes, and for each
+    entry the node whose list it came from.
+    """
+    starts = offsets[nodes]
+    counts = offsets[nodes + 1] - starts
+    total = int(counts.sum())
+    owners = np.repeat(nodes, counts)
+    # Position of every entry: the start of its list plus its rank in it.
+    ends = np.cumsum(counts)
+    positions = np.arange(total) + np.repeat(starts - ends + counts, counts)
+    return indices[positions], owners
+
+
+def _offsets(sorted_nodes, count):
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sorted_nodes, minlength=count), out=offsets[1:])
+    return offsets
+
+
+def _read_columns(filename, columns):
+    """
+    Returns one list of strings per requested column of a CSV file.
+    """
+    with open(filename, encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        indices = [header.index(column) for column in columns]
+        values = tuple([] for _ in columns)
+        for row in reader:
+            for column, index in zip(values, indices):
+                column.append(row[index])
+    return values
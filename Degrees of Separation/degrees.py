@@ -1,7 +1,17 @@
+import argparse
 import csv
+import multiprocessing
 import sys
+import time
+from collections import deque
 
-from util import Node, QueueFrontier, StackFrontier
+from util import DisjointSet, Node, QueueFrontier, StackFrontier
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, peak memory is then left out of reports.
+    resource = None
 
 # Maps names to a set of corresponding person_ids
 people_to_ids = {}
@@ -12,14 +22,63 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Maps person_ids to a label shared by everyone in the same connected component
+components = {}
+
+# CSRGraph holding all of the above when the "csr" backend is loaded
+graph = None
+
+# nameindex.NameIndex of all people and the person_id of each of its
+# person indices, built on the first call of find_people
+nameIndex = None
+nameIndexIds = None
+
 
-def load_data(directory, print_messages):
+def load_data(directory, print_messages, backend="dict", cache=False):
     """
-    Load data from CSV files into memory
+    Load data from CSV files into memory.
+
+    The "dict" backend fills people_to_ids, people and movies.
+    The "csr" backend builds a compact csrgraph.CSRGraph into graph instead.
+    With cache, the "csr" backend reuses a binary snapshot of the graph
+    from an earlier run while the CSV files are unchanged.
     """
+    global graph, nameIndex, nameIndexIds
 
+    nameIndex = nameIndexIds = None
     if print_messages:
         print(f"Loading data from '{directory}' ...")
+    startTime = time.perf_counter()
+
+    if cache and backend != "csr":
+        raise ValueError("Only the csr backend can be cached")
+
+    if backend == "csr":
+        from csrgraph import CSRGraph
+        if cache:
+            import snapshot
+            graph = snapshot.load(directory)
+            if graph is not None:
+                if print_messages:
+                    print("Using the snapshot from an earlier run.")
+                    report_load(startTime)
+                return
+        loadStats = {}
+        graph = CSRGraph.from_csv(directory, loadStats)
+        if print_messages:
+            rate = loadStats["star_rows"] / max(loadStats["star_seconds"], 1e-9)
+            print(f"Read {loadStats['star_rows']} star rows at {rate:,.0f} rows/s.")
+        if cache:
+            snapshot.save(graph, directory)
+            if print_messages:
+                print("Saved a snapshot for later runs.")
+        if print_messages:
+            print(f"Graph arrays take {graph.nbytes / 2**20:.1f} MiB.")
+            report_load(startTime)
+        return
+    elif backend != "dict":
+        raise ValueError(f"Unknown backend '{backend}'")
+    graph = None
 
     # Load people and construct people_to_ids mapping
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
@@ -45,24 +104,68 @@ def load_data(directory, print_messages):
                 "stars": set()
             }
 
-    # Load stars and link them to people and movies
+    # Load stars and link them to people and movies.
+    # Everyone is also joined with one earlier star of the same movie,
+    # which leaves connected people in the same set of disjoint.
+    disjoint = DisjointSet()
     with open(f"{directory}/stars.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for row in reader:
             try:
+                stars = movies[row["movie_id"]]["stars"]
                 people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
             except KeyError:
-                pass
+                continue
+            if stars:
+                disjoint.union(row["person_id"], next(iter(stars)))
+            stars.add(row["person_id"])
+
+    for person_id in people:
+        components[person_id] = disjoint.find(person_id)
 
     if print_messages:
-        print("Data loaded.")
+        report_load(startTime)
+
 
+def worker_initializer():
+    """
+    Returns the initializer of worker processes, called with the
+    arguments of load_data. Forked workers inherit the loaded data,
+    others load it themselves.
+    """
+    if multiprocessing.get_start_method() == "fork":
+        return None
+    return load_data
+
+
+def report_load(startTime):
+    """
+    Print the time taken since startTime and the peak memory use.
+    """
+    message = f"Data loaded in {time.perf_counter() - startTime:.2f} s"
+    peak = peak_memory()
+    if peak is not None:
+        message += f", peak memory {peak:.1f} MiB"
+    print(message + ".")
 
-def main(directory, is_verbose=True):
+
+def peak_memory():
+    """
+    Returns the peak resident memory of this process in MiB,
+    or None where it cannot be measured.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kibibytes, macOS bytes.
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def main(directory, is_verbose=True, bidirectional=False, backend="dict",
+         cache=False, fuzzy=False):
 
     # Load data from files into memory
-    load_data(directory, is_verbose)
+    load_data(directory, is_verbose, backend, cache)
 
     name_prompt = "Name: " if is_verbose else ""
     continue_prompt = "Try again (Y/N)? " if is_verbose else ""
@@ -74,17 +177,20 @@ def main(directory, is_verbose=True):
         star_name_2 = input(name_prompt)
 
         # Find ID for the first star
-        source = person_id_for_name(star_name_1, is_verbose)
+        source = person_id_for_name(star_name_1, is_verbose, fuzzy)
         if source is None:
             sys.exit("Person 1 not found.")
 
         # Find ID for the second star
-        target = person_id_for_name(star_name_2, is_verbose)
+        target = person_id_for_name(star_name_2, is_verbose, fuzzy)
         if target is None:
             sys.exit("Person 2 not found.")
 
         # Find shortest path between source and target stars
-        path = shortest_path(source, target)
+        if bidirectional:
+            path = shortest_path_bidirectional(source, target)
+        else:
+            path = shortest_path(source, target)
 
         if path is None:
             print("Not connected.")
@@ -94,9 +200,9 @@ def main(directory, is_verbose=True):
             path = [(None, source)] + path
             if is_verbose:
                 for i in range(degrees):
-                    person1 = people[path[i][1]]["name"]
-                    person2 = people[path[i + 1][1]]["name"]
-                    movie = movies[path[i + 1][0]]["title"]
+                    person1 = person_name(path[i][1])
+                    person2 = person_name(path[i + 1][1])
+                    movie = movie_title(path[i + 1][0])
                     print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
         give_another_pair = input(continue_prompt)
@@ -104,12 +210,70 @@ def main(directory, is_verbose=True):
             break
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, stats=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
     If no possible path, returns None.
+    If a `stats` dictionary is given, the number of expanded
+    people is stored in it under "expanded".
+    """
+    if graph is not None:
+        return graph.shortest_path(source, target, stats)
+    if not connected(source, target):
+        if stats is not None:
+            stats["expanded"] = 0
+        return None
+
+    # Walks the people and movies dictionaries directly instead of
+    # going through neighbors_for_person and util.Node, so that
+    # nothing is allocated per link. Every reached person gets one
+    # entry in each of the parent dictionaries, and every movie is
+    # looked through only once, by the first person to reach it.
+    parentMovie = {source: None}
+    parentPerson = {source: None}
+    seenMovies = set()
+    frontier = deque([source])
+    expanded = 0
+
+    while frontier:
+        personId = frontier.popleft()
+        expanded += 1
+        for movieId in people[personId]["movies"]:
+            if movieId in seenMovies:
+                continue
+            seenMovies.add(movieId)
+            for neighborId in movies[movieId]["stars"]:
+                if neighborId == target:
+                    if stats is not None:
+                        stats["expanded"] = expanded
+                    path_ = _trace_parents(parentMovie, parentPerson, personId)
+                    path_.append((movieId, neighborId))
+                    return path_
+                if neighborId not in parentPerson:
+                    parentMovie[neighborId] = movieId
+                    parentPerson[neighborId] = personId
+                    frontier.append(neighborId)
+
+    if stats is not None:
+        stats["expanded"] = expanded
+    return None
+
+
+def _trace_parents(parentMovie, parentPerson, personId):
+    path_ = list()
+    while parentPerson[personId] is not None:
+        path_.append((parentMovie[personId], personId))
+        personId = parentPerson[personId]
+    path_.reverse()
+    return path_
+
+
+def shortest_path_nodes(source, target, stats=None):
+    """
+    The original shortest_path, which wraps every neighbor in a
+    util.Node. Kept as the baseline for benchmark.py.
     """
     # Using the QueueFrontier subclass of Stackfrontier because the
     # remove() method pops from the left instead of the right.
@@ -118,20 +282,25 @@ def shortest_path(source, target):
     frontier.add(first_node)
     visited = QueueFrontier()
     knownNames = set()
+    expanded = 0
 
     while True:
         # Empties eventually if all possible paths exhausted.
         if frontier.empty():
-            print(time.time() - startTime)
+            if stats is not None:
+                stats["expanded"] = expanded
             return None
 
         person = frontier.remove()
         visited.add(person)
+        expanded += 1
         
         for n in neighbors_for_person(person.state):
             nPerson = Node(state = n[1], parent = person, action = n[0])
             personId = nPerson.state
             if personId == target:
+                if stats is not None:
+                    stats["expanded"] = expanded
                 return build_path(nPerson)
             
             # Chose set as knownNames datatype instead of using the
@@ -141,7 +310,196 @@ def shortest_path(source, target):
             elif (personId not in knownNames):
                 knownNames.add(personId)
                 frontier.add(nPerson)
-            
+
+
+def shortest_path_bidirectional(source, target, stats=None):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, like shortest_path.
+
+    Searches from both ends at the same time, always expanding
+    one whole level of the smaller frontier, and stops once the
+    two searches meet.
+    """
+    # A person is one degree away from themselves when they have starred
+    # in anything, so that case is answered exactly like shortest_path.
+    if source == target:
+        return shortest_path(source, target, stats)
+    if not connected(source, target):
+        if stats is not None:
+            stats["expanded"] = 0
+        return None
+
+    # Both maps take a person to the (movie_id, person_id) step that
+    # leads one link closer to the side the search started from.
+    forward = {source: None}
+    backward = {target: None}
+    forwardFrontier = [source]
+    backwardFrontier = [target]
+    expanded = 0
+
+    while forwardFrontier and backwardFrontier:
+        if len(forwardFrontier) <= len(backwardFrontier):
+            frontier, parents, others = forwardFrontier, forward, backward
+        else:
+            frontier, parents, others = backwardFrontier, backward, forward
+
+        # The whole level is expanded before deciding, because the
+        # first meeting found is not necessarily on the shortest path.
+        nextFrontier = []
+        meeting = None
+        bestLength = None
+        for personId in frontier:
+            expanded += 1
+            for movieId, neighborId in neighbors_for_person(personId):
+                if neighborId in parents:
+                    continue
+                parents[neighborId] = (movieId, personId)
+                nextFrontier.append(neighborId)
+                if neighborId in others:
+                    length = _chain_length(others, neighborId)
+                    if bestLength is None or length < bestLength:
+                        meeting = neighborId
+                        bestLength = length
+
+        if meeting is not None:
+            if stats is not None:
+                stats["expanded"] = expanded
+            return _join_paths(forward, backward, meeting)
+
+        if frontier is forwardFrontier:
+            forwardFrontier = nextFrontier
+        else:
+            backwardFrontier = nextFrontier
+
+    if stats is not None:
+        stats["expanded"] = expanded
+    return None
+
+
+def _chain_length(parents, personId):
+    """
+    Returns the number of links from personId back to the root of parents.
+    """
+    length = 0
+    while parents[personId] is not None:
+        personId = parents[personId][1]
+        length += 1
+    return length
+
+
+def _join_paths(forward, backward, meeting):
+    """
+    Joins the two half searches of shortest_path_bidirectional
+    at the meeting person into a (movie_id, person_id) path.
+    """
+    path_ = _trace_path(forward, meeting)
+    personId = meeting
+    while backward[personId] is not None:
+        movieId, childId = backward[personId]
+        path_.append((movieId, childId))
+        personId = childId
+    return path_
+
+
+def _trace_path(parents, personId):
+    """
+    Returns the (movie_id, person_id) path from the root of parents
+    to personId, where parents maps each reached person to the
+    (movie_id, person_id) step one link closer to the root.
+    """
+    path_ = list()
+    while parents[personId] is not None:
+        movieId, parentId = parents[personId]
+        path_.append((movieId, personId))
+        personId = parentId
+    path_.reverse()
+    return path_
+
+
+def shortest_paths_from(source, targets):
+    """
+    Returns a dictionary that maps each of targets to its shortest
+    path from source, or None, all found with one search from source.
+    """
+    if graph is not None:
+        return graph.shortest_paths_from(source, targets)
+
+    paths = dict()
+    # People in other components can never be reached.
+    remaining = {target for target in targets if connected(source, target)}
+    if source in remaining:
+        # Keeps the answer for a person and themselves as in shortest_path.
+        paths[source] = shortest_path(source, source)
+        remaining.discard(source)
+
+    # Same traversal as shortest_path, one level at a time.
+    parents = {source: None}
+    seenMovies = set()
+    frontier = [source]
+    while frontier and remaining:
+        nextFrontier = []
+        for personId in frontier:
+            for movieId in people[personId]["movies"]:
+                if movieId in seenMovies:
+                    continue
+                seenMovies.add(movieId)
+                for neighborId in movies[movieId]["stars"]:
+                    if neighborId not in parents:
+                        parents[neighborId] = (movieId, personId)
+                        nextFrontier.append(neighborId)
+                        remaining.discard(neighborId)
+        frontier = nextFrontier
+
+    for target in targets:
+        if target not in paths:
+            paths[target] = _trace_path(parents, target) if target in parents else None
+    return paths
+
+
+def distances_from(source):
+    """
+    Yields (person_id, distance) for every person reachable from
+    source, source itself included at distance 0, in order of
+    distance. Only the current level is kept besides the set of
+    people already reached.
+    """
+    if graph is not None:
+        yield from graph.distances_from(source)
+        return
+
+    reached = {source}
+    seenMovies = set()
+    frontier = [source]
+    distance = 0
+    while frontier:
+        nextFrontier = []
+        for personId in frontier:
+            yield personId, distance
+            for movieId in people[personId]["movies"]:
+                if movieId in seenMovies:
+                    continue
+                seenMovies.add(movieId)
+                for neighborId in movies[movieId]["stars"]:
+                    if neighborId not in reached:
+                        reached.add(neighborId)
+                        nextFrontier.append(neighborId)
+        frontier = nextFrontier
+        distance += 1
+
+
+def level_sizes(source):
+    """
+    Returns a list of how many people are at each distance from source.
+    """
+    if graph is not None:
+        return [len(level) for level in graph.levels(graph.person_index(source))]
+    sizes = []
+    for _, distance in distances_from(source):
+        if distance == len(sizes):
+            sizes.append(0)
+        sizes[distance] += 1
+    return sizes
 
 
 def build_path(person):
@@ -155,34 +513,46 @@ def build_path(person):
     
 
 
-def person_id_for_name(name, is_verbose):
+def person_id_for_name(name, is_verbose, fuzzy=False):
     """
-    Returns the IMDB id for a person's name,
-    resolving ambiguities as needed.
+    Returns the IMDB id for a person's name, or for an id as such.
+
+    Among several people with the name, the one ranked first by
+    rank_people is picked. If nobody has exactly this name, None is
+    returned, or with fuzzy the best prefix or typo tolerant match of
+    find_people, which is reported on stderr even when not verbose.
     """
-    person_ids = list(people_to_ids.get(name.lower(), set()))
+    if person_exists(name):
+        return name
+
+    person_ids = rank_people(ids_for_name(name))
     if len(person_ids) == 0:
-        return None
+        matches = find_people(name, 5) if fuzzy else []
+        if len(matches) == 0:
+            return None
+        print(f"No one is called '{name}', using '{person_name(matches[0][0])}' "
+              f"(ID {matches[0][0]}) instead.", file=sys.stderr)
+        if is_verbose:
+            for person_id, match in matches[1:]:
+                print(f"  Also found ID: {person_id}, Name: {person_name(person_id)}")
+        person_id = matches[0][0]
     elif len(person_ids) > 1:
         if is_verbose:
-            print(f"Which '{name}'?")
-
-            for person_id in person_ids:
-                person = people[person_id]
-                name = person["name"]
-                birth = person["birth"]
-                print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
-        try:
-            id_prompt = "Intended Person ID: " if is_verbose else ""
-            person_id = input(id_prompt)
-            if person_id in person_ids:
-                return person_id
-        except ValueError:
-            pass
-        return None
+            print(f"Several people are called '{name}', using the one with most movies.")
+            for person_id in person_ids[1:]:
+                birth = person_birth(person_id)
+                print(f"  Also found ID: {person_id}, Birth: {birth}, "
+                      f"Movies: {movie_count(person_id)}")
+            print("  Give the ID instead of the name to pick another one.")
+        person_id = person_ids[0]
     else:
         return person_ids[0]
 
+    if is_verbose:
+        print(f"ID: {person_id}, Name: {person_name(person_id)}, "
+              f"Birth: {person_birth(person_id)}")
+    return person_id
+
 
 def neighbors_for_person(person_id):
     """
@@ -190,6 +560,9 @@ def neighbors_for_person(person_id):
     who starred with a given person.
     """
 
+    if graph is not None:
+        return graph.neighbors(person_id)
+
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
@@ -199,27 +572,132 @@ def neighbors_for_person(person_id):
     return neighbors
 
 
-if __name__ == "__main__":
-    verbose = True
-    directory = None
-
-    if len(sys.argv) == 3 and sys.argv[1] == "--quiet":
-        # disable user prompts and other extra output (used inside grader)
-        verbose = False
-        directory = sys.argv[2]
-    elif len(sys.argv) == 2:
-        if sys.argv[1] == "--quiet":
-            # disable user prompts and other extra output (used inside grader)
-            verbose = False
-            # use large dataset by default if directory is not provided
-            directory = "large"
+def find_people(query, limit=10):
+    """
+    Returns up to limit (person_id, match) pairs for query, where match
+    is "exact", "prefix" or "fuzzy". Exact matches come first, then
+    names starting with query, then names a couple of typos away.
+    People with the same name are ranked by rank_people.
+    """
+    global nameIndex, nameIndexIds
+    if nameIndex is None:
+        from nameindex import NameIndex
+        if graph is not None:
+            nameIndexIds = graph.person_ids
+            nameIndex = NameIndex(graph.names)
         else:
-            directory = sys.argv[1]
-    elif len(sys.argv) == 1:
-        # use large dataset by default if directory is not provided
-        directory = "large"
+            nameIndexIds = list(people)
+            nameIndex = NameIndex([people[person_id]["name"] for person_id in nameIndexIds])
+
+    found = []
+    seen = set()
 
-    if directory is None or len(directory.strip()) == 0:
-        sys.exit("Usage: python degrees.py [--quiet] [directory]")
+    def add(indices, match):
+        for person_id in rank_people([nameIndexIds[i] for i in indices]):
+            if person_id not in seen and len(found) < limit:
+                seen.add(person_id)
+                found.append((person_id, match))
 
-    main(directory, verbose)
+    add(nameIndex.exact(query), "exact")
+    for _, indices in nameIndex.prefix(query, limit):
+        add(indices, "prefix")
+    if len(found) < limit:
+        for _, _, indices in nameIndex.fuzzy(query, limit):
+            add(indices, "fuzzy")
+    return found
+
+
+def rank_people(person_ids):
+    """
+    Returns person_ids with the people who starred in the most movies
+    first, and among those the earliest born.
+    """
+    def key(person_id):
+        birth = person_birth(person_id)
+        return (-movie_count(person_id), 0 if birth else 1, birth)
+    return sorted(person_ids, key=key)
+
+
+def movie_count(person_id):
+    if graph is not None:
+        return graph.movie_count(person_id)
+    return len(people[person_id]["movies"])
+
+
+def ids_for_name(name):
+    """
+    Returns the set of person_ids with the given name, ignoring case.
+    """
+    if graph is not None:
+        return graph.ids_for_name(name)
+    return people_to_ids.get(name.lower(), set())
+
+
+def person_name(person_id):
+    if graph is not None:
+        return graph.person_name(person_id)
+    return people[person_id]["name"]
+
+
+def person_birth(person_id):
+    if graph is not None:
+        return graph.person_birth(person_id)
+    return people[person_id]["birth"]
+
+
+def movie_title(movie_id):
+    if graph is not None:
+        return graph.movie_title(movie_id)
+    return movies[movie_id]["title"]
+
+
+def connected(source, target):
+    """
+    Returns True if source and target are in the same connected
+    component, so that some path between them exists.
+    """
+    if graph is not None:
+        return graph.connected(source, target)
+    return components[source] == components[target]
+
+
+def person_exists(person_id):
+    if graph is not None:
+        return graph.person_index(person_id) is not None
+    return person_id in people
+
+
+def starring_people():
+    """
+    Returns the person_ids of everyone who starred in at least one movie.
+    """
+    if graph is not None:
+        return graph.starring_people()
+    return [person_id for person_id in people if people[person_id]["movies"]]
+
+
+if __name__ == "__main__":
+    argParser = argparse.ArgumentParser(
+        usage="python degrees.py [--quiet] [--bidirectional] "
+              "[--backend {dict,csr}] [--cache] [--fuzzy] [directory]")
+    # disable user prompts and other extra output (used inside grader)
+    argParser.add_argument("--quiet", action="store_true")
+    argParser.add_argument("--bidirectional", action="store_true",
+                           help="search from both people at once")
+    argParser.add_argument("--backend", choices=("dict", "csr"), default="dict",
+                           help="in-memory graph representation")
+    argParser.add_argument("--cache", action="store_true",
+                           help="reuse a binary snapshot of the csr graph")
+    argParser.add_argument("--fuzzy", action="store_true",
+                           help="use the closest match of names nobody has")
+    # use large dataset by default if directory is not provided
+    argParser.add_argument("directory", nargs="?", default="large")
+    args = argParser.parse_args()
+
+    if len(args.directory.strip()) == 0:
+        sys.exit(f"Usage: {argParser.usage}")
+    if args.cache and args.backend != "csr":
+        sys.exit("--cache needs --backend csr")
+
+    main(args.directory, not args.quiet, args.bidirectional, args.backend,
+         args.cache, args.fuzzy)
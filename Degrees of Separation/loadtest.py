@@ -0,0 +1,78 @@
+"""
+Load test for server.py: sends queries for random pairs of people
+with a fixed number in flight and reports throughput and latency.
+
+Usage: python loadtest.py [--host HOST] [--port PORT] [--socket PATH]
+                          [--requests N] [--concurrency C] [--seed S]
+                          directory
+"""
+
+import argparse
+import asyncio
+import csv
+import random
+import statistics
+import time
+
+from client import fetch, path_query
+
+
+def read_people(directory):
+    with open(f"{directory}/people.csv", encoding="utf-8") as f:
+        return [row["id"] for row in csv.DictReader(f)]
+
+
+async def run(queries, concurrency, host, port, socket):
+    """
+    Sends every query with at most concurrency in flight and returns
+    the client side latencies and the number of failed requests.
+    """
+    pending = iter(queries)
+    latencies = []
+    failures = 0
+
+    async def worker():
+        nonlocal failures
+        for source, target in pending:
+            start = time.perf_counter()
+            status, _ = await fetch(path_query(source, target), host, port, socket)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                failures += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, failures
+
+
+def main():
+    argParser = argparse.ArgumentParser()
+    argParser.add_argument("directory", help="data directory the server loaded")
+    argParser.add_argument("--host", default="127.0.0.1")
+    argParser.add_argument("--port", type=int, default=8310)
+    argParser.add_argument("--socket")
+    argParser.add_argument("--requests", type=int, default=200)
+    argParser.add_argument("--concurrency", type=int, default=8)
+    argParser.add_argument("--seed", type=int, default=0)
+    args = argParser.parse_args()
+
+    random.seed(args.seed)
+    people = read_people(args.directory)
+    queries = [(random.choice(people), random.choice(people))
+               for _ in range(args.requests)]
+
+    start = time.perf_counter()
+    latencies, failures = asyncio.run(run(
+        queries, args.concurrency, args.host, args.port, args.socket))
+    elapsed = time.perf_counter() - start
+
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    print(f"{len(latencies)} requests, {failures} failed, "
+          f"{len(latencies) / elapsed:.1f} requests/s")
+    print(f"latency p50 {1000 * cuts[49]:.2f} ms, p90 {1000 * cuts[89]:.2f} ms, "
+          f"p99 {1000 * cuts[98]:.2f} ms, max {1000 * max(latencies):.2f} ms")
+    _, stats = asyncio.run(fetch("/stats", args.host, args.port, args.socket))
+    print(f"server: {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Name index for looking people up by exact name, prefix or a name
+with typos, for degrees.find_people.
+
+Names are compared in lowercase. Every distinct name is kept in a
+sorted list for exact and prefix lookups by binary search. For typo
+tolerant lookups every name is also split into trigrams, and the
+trigrams of the query pick the candidate names that share the most
+trigrams with it, which are then ranked by edit distance.
+"""
+
+import bisect
+
+import numpy as np
+
+# Trigrams found in more names than this are left out of candidate
+# counting when the query has rarer ones, as they say little.
+COMMON_TRIGRAM = 20000
+
+# Number of candidates checked for edit distance per fuzzy lookup
+CANDIDATES = 64
+
+
+class NameIndex:
+
+    def __init__(self, names):
+        """
+        Index names, a sequence holding one name per person index.
+        """
+        keys = [name.lower() for name in names]
+        self.keys = sorted(set(keys))
+        keyIds = {key: i for i, key in enumerate(self.keys)}
+
+        # People of each distinct name, as CSR arrays.
+        owners = np.array([keyIds[key] for key in keys], dtype=np.int32)
+        self.key_people = np.argsort(owners, kind="stable").astype(np.int32)
+        self.key_offsets = np.zeros(len(self.keys) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(owners, minlength=len(self.keys)), out=self.key_offsets[1:])
+
+        # Names of each trigram, as CSR arrays over the sorted trigram codes.
+        codes = []
+        codeKeys = []
+        for keyId, key in enumerate(self.keys):
+            keyCodes = set(trigrams(key))
+            codes.extend(keyCodes)
+            codeKeys.extend([keyId] * len(keyCodes))
+        codes = np.array(codes, dtype=np.int64)
+        order = np.argsort(codes, kind="stable")
+        codes = codes[order]
+        self.gram_keys = np.array(codeKeys, dtype=np.int32)[order]
+        self.grams, starts = np.unique(codes, return_index=True)
+        self.gram_offsets = np.append(starts, len(codes)).astype(np.int64)
+
+    def people(self, keyId):
+        """
+        Returns the person indices with the distinct name keyId.
+        """
+        return self.key_people[self.key_offsets[keyId]:self.key_offsets[keyId + 1]].tolist()
+
+    def exact(self, name):
+        """
+        Returns the person indices whose name is name, ignoring case.
+        """
+        name = name.lower()
+        i = bisect.bisect_left(self.keys, name)
+        if i < len(self.keys) and self.keys[i] == name:
+            return self.people(i)
+        return []
+
+    def prefix(self, prefix, limit):
+        """
+        Returns up to limit distinct names starting with prefix, as
+        (name, person indices) pairs in alphabetical order.
+        """
+        prefix = prefix.lower()
+        matches = []
+        i = bisect.bisect_left(self.keys, prefix)
+        while i < len(self.keys) and len(matches) < limit and self.keys[i].startswith(prefix):
+            matches.append((self.keys[i], self.people(i)))
+            i += 1
+        return matches
+
+    def fuzzy(self, name, limit, max_distance=2):
+        """
+        Returns up to limit (distance, name, person indices) triples for
+        the distinct names within max_distance edits of name, closest first.
+        """
+        name = name.lower()
+        codes = np.array(list(set(trigrams(name))), dtype=np.int64)
+        positions = np.searchsorted(self.grams, codes)
+        postings = []
+        for position, code in zip(positions.tolist(), codes.tolist()):
+            if position < len(self.grams) and self.grams[position] == code:
+                start = self.gram_offsets[position]
+                end = self.gram_offsets[position + 1]
+                postings.append(self.gram_keys[start:end])
+        if not postings:
+            return []
+        counted = [p for p in postings if len(p) <= COMMON_TRIGRAM] or postings
+        candidates, shared = np.unique(np.concatenate(counted), return_counts=True)
+
+        # Each edit takes away at most three of the counted trigrams,
+        # so names sharing fewer of them cannot be close enough.
+        close = shared >= len(counted) - 3 * max_distance
+        candidates, shared = candidates[close], shared[close]
+        if len(candidates) > CANDIDATES:
+            best = np.argpartition(-shared, CANDIDATES)[:CANDIDATES]
+            candidates = candidates[best]
+
+        matches = []
+        for keyId in candidates.tolist():
+            key = self.keys[keyId]
+            distance = edit_distance(name, key, max_distance)
+            if distance <= max_distance:
+                matches.append((distance, key, self.people(keyId)))
+        matches.sort()
+        return matches[:limit]
+
+
+def trigrams(name):
+    """
+    Yields integer codes of the trigrams of name, padded with spaces
+    so that the beginning and end of the name count as well.
+    """
+    padded = f"  {name} "
+    for i in range(len(padded) - 2):
+        yield (ord(padded[i]) << 42) | (ord(padded[i + 1]) << 21) | ord(padded[i + 2])
+
+
+def edit_distance(a, b, limit):
+    """
+    Returns the Levenshtein distance of a and b, or limit + 1 if it
+    is larger than limit. Only the band of width 2 * limit + 1 around
+    the diagonal is computed.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    infinity = limit + 1
+    previous = [j if j <= limit else infinity for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [infinity] * (len(b) + 1)
+        if i <= limit:
+            current[0] = i
+        low = max(1, i - limit)
+        high = min(len(b), i + limit)
+        for j in range(low, high + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+        if min(current) > limit:
+            return infinity
+        previous = current
+    return min(previous[len(b)], infinity)
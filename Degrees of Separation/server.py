@@ -0,0 +1,209 @@
+"""
+Long-running degrees of separation server.
+
+Loads the data once and answers queries over HTTP on a local TCP port
+or Unix socket. The event loop only parses requests, the searches run
+in a process pool so that several queries are answered at once.
+
+    GET /path?source=NAME_OR_ID&target=NAME_OR_ID
+    GET /stats
+    GET /health
+
+Usage: python server.py [--host HOST] [--port PORT] [--socket PATH]
+                        [--workers N] [--backend {dict,csr}] [--cache]
+                        [--bidirectional] directory
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import statistics
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import degrees
+from batch import resolve
+
+# Number of latest query latencies kept for the percentiles of /stats
+LATENCY_WINDOW = 10000
+
+
+def answer(source, target, bidirectional=False):
+    """
+    Returns the JSON ready answer for one query. Runs in the worker processes.
+    """
+    sourceId, error = resolve(source)
+    targetId = None
+    if error is None:
+        targetId, error = resolve(target)
+    if error is not None:
+        return {"source": source, "target": target, "error": error}
+
+    stats = {}
+    start = time.perf_counter()
+    if bidirectional:
+        path = degrees.shortest_path_bidirectional(sourceId, targetId, stats)
+    else:
+        path = degrees.shortest_path(sourceId, targetId, stats)
+    return {
+        "source": source, "target": target,
+        "source_id": sourceId, "target_id": targetId,
+        "degrees": None if path is None else len(path),
+        "path": None if path is None else [list(step) for step in path],
+        "expanded": stats["expanded"],
+        "search_ms": 1000 * (time.perf_counter() - start)
+    }
+
+
+class Counters:
+    """
+    Per query latency and expansion counters reported by /stats.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.errors = 0
+        self.expanded = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def add(self, result, latency):
+        self.queries += 1
+        if "error" in result:
+            self.errors += 1
+        else:
+            self.expanded += result["expanded"]
+        self.latencies.append(latency)
+
+    def report(self):
+        report = {"queries": self.queries, "errors": self.errors,
+                  "expanded": self.expanded}
+        if len(self.latencies) >= 2:
+            cuts = statistics.quantiles(self.latencies, n=100, method="inclusive")
+            report["latency_ms"] = {
+                "mean": 1000 * statistics.mean(self.latencies),
+                "p50": 1000 * cuts[49], "p90": 1000 * cuts[89],
+                "p99": 1000 * cuts[98], "max": 1000 * max(self.latencies)
+            }
+        return report
+
+
+class Server:
+
+    def __init__(self, executor, bidirectional=False):
+        self.executor = executor
+        self.bidirectional = bidirectional
+        self.counters = Counters()
+
+    async def handle(self, reader, writer):
+        """
+        Serve one HTTP request on a connection and close it.
+        """
+        try:
+            requestLine = await reader.readline()
+            # Headers are read and ignored, no request has a body.
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = requestLine.decode("latin-1").split()
+            if len(parts) != 3:
+                status, body = 400, {"error": "bad request"}
+            elif parts[0] != "GET":
+                status, body = 405, {"error": "only GET is supported"}
+            else:
+                status, body = await self.route(parts[1])
+        except Exception as e:
+            status, body = 500, {"error": str(e)}
+
+        data = json.dumps(body).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: close\r\n\r\n".encode("latin-1") + data)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def route(self, target):
+        url = urlsplit(target)
+        if url.path == "/health":
+            return 200, {"ok": True}
+        elif url.path == "/stats":
+            return 200, self.counters.report()
+        elif url.path == "/path":
+            query = parse_qs(url.query)
+            if "source" not in query or "target" not in query:
+                return 400, {"error": "source and target are required"}
+            start = time.perf_counter()
+            result = await asyncio.get_running_loop().run_in_executor(
+                self.executor, answer, query["source"][0], query["target"][0],
+                self.bidirectional)
+            latency = time.perf_counter() - start
+            self.counters.add(result, latency)
+            result["latency_ms"] = 1000 * latency
+            return (400 if "error" in result else 200), result
+        return 404, {"error": f"no such endpoint {url.path}"}
+
+
+async def serve(args):
+    loadArgs = (args.directory, False, args.backend, args.cache)
+    initializer = degrees.worker_initializer()
+
+    with ProcessPoolExecutor(args.workers, initializer=initializer,
+                             initargs=loadArgs) as executor:
+        # Start the workers before listening, so that forked workers
+        # do not inherit the sockets of connections and keep them open.
+        await asyncio.get_running_loop().run_in_executor(executor, os.getpid)
+
+        server = Server(executor, args.bidirectional)
+        if args.socket is not None:
+            listener = await asyncio.start_unix_server(server.handle, args.socket)
+            where = args.socket
+        else:
+            listener = await asyncio.start_server(server.handle, args.host, args.port)
+            where = f"http://{args.host}:{args.port}"
+        print(f"Serving on {where}", flush=True)
+
+        # Stop cleanly on SIGINT and SIGTERM, so that the worker
+        # processes are shut down together with the server.
+        loop = asyncio.get_running_loop()
+        stop = loop.create_future()
+        for signalNumber in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signalNumber, stop.cancel)
+            except NotImplementedError:
+                pass
+        async with listener:
+            try:
+                await stop
+            except asyncio.CancelledError:
+                pass
+        if args.socket is not None:
+            os.remove(args.socket)
+
+
+def main():
+    argParser = argparse.ArgumentParser()
+    argParser.add_argument("directory")
+    argParser.add_argument("--host", default="127.0.0.1")
+    argParser.add_argument("--port", type=int, default=8310)
+    argParser.add_argument("--socket", help="listen on this Unix socket instead")
+    argParser.add_argument("--workers", type=int, default=None)
+    argParser.add_argument("--backend", choices=("dict", "csr"), default="dict")
+    argParser.add_argument("--cache", action="store_true")
+    argParser.add_argument("--bidirectional", action="store_true")
+    args = argParser.parse_args()
+    if args.cache and args.backend != "csr":
+        sys.exit("--cache needs --backend csr")
+
+    degrees.load_data(args.directory, True, args.backend, args.cache)
+    asyncio.run(serve(args))
+
+
+if __name__ == "__main__":
+    main()
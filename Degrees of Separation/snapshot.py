@@ -0,0 +1,160 @@
+"""
+Binary snapshot cache for the CSR graph of degrees.py.
+
+After the first parse of a data directory the graph is written to
+<directory>/.snapshot as plain .npy arrays, which later runs map
+into memory instead of parsing the CSV files again. Strings are kept
+as one UTF-8 byte array per column plus an offsets array.
+
+The snapshot records the size and modification time of every CSV
+file and is ignored once any of them changes.
+"""
+
+import bisect
+import json
+import os
+
+import numpy as np
+
+from csrgraph import CSRGraph
+
+SNAPSHOT_DIRECTORY = ".snapshot"
+FORMAT_VERSION = 2
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+ARRAYS = ("person_offsets", "person_movies", "movie_offsets", "movie_people",
+          "components")
+STRINGS = ("person_ids", "names", "births", "movie_ids", "titles", "years")
+
+
+class StringArray:
+    """
+    Read-only sequence of strings stored as a byte blob and offsets.
+    """
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        i = int(i)
+        if i < 0 or i >= len(self):
+            raise IndexError("string index out of range")
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class SortedIndex:
+    """
+    Dict-like lookup from string to position, by binary search
+    over a precomputed sort order of the strings.
+    With multiple set, get() returns the list of all matching positions.
+    """
+
+    def __init__(self, strings, order, transform=None, multiple=False):
+        self.strings = strings
+        self.order = order
+        self.transform = transform
+        self.multiple = multiple
+
+    def _key(self, k):
+        value = self.strings[self.order[k]]
+        return value if self.transform is None else self.transform(value)
+
+    def get(self, value, default=None):
+        low = bisect.bisect_left(range(len(self.order)), value, key=self._key)
+        if not self.multiple:
+            if low < len(self.order) and self._key(low) == value:
+                return int(self.order[low])
+            return default
+        high = bisect.bisect_right(range(len(self.order)), value, lo=low, key=self._key)
+        if low == high:
+            return default
+        return [int(i) for i in self.order[low:high]]
+
+
+def sort_order(strings, transform=None):
+    """
+    Returns the positions of strings in sorted order as an int64 array.
+    """
+    if transform is None:
+        key = strings.__getitem__
+    else:
+        key = lambda i: transform(strings[i])
+    return np.array(sorted(range(len(strings)), key=key), dtype=np.int64)
+
+
+def source_signature(directory):
+    """
+    Returns the size and modification time of every source CSV file.
+    """
+    signature = {}
+    for name in SOURCES:
+        stat = os.stat(os.path.join(directory, name))
+        signature[name] = [stat.st_size, stat.st_mtime_ns]
+    return signature
+
+
+def save(graph, directory):
+    """
+    Write graph as a snapshot of the data in directory.
+    """
+    path = os.path.join(directory, SNAPSHOT_DIRECTORY)
+    os.makedirs(path, exist_ok=True)
+
+    # The manifest goes last and is removed first, so a snapshot
+    # interrupted while being written is never picked up.
+    manifest = os.path.join(path, "manifest.json")
+    if os.path.exists(manifest):
+        os.remove(manifest)
+
+    for name in ARRAYS:
+        np.save(os.path.join(path, f"{name}.npy"), getattr(graph, name))
+    for name in STRINGS:
+        encoded = [value.encode("utf-8") for value in getattr(graph, name)]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        np.save(os.path.join(path, f"{name}.npy"),
+                np.frombuffer(b"".join(encoded), dtype=np.uint8))
+        np.save(os.path.join(path, f"{name}_offsets.npy"), offsets)
+    np.save(os.path.join(path, "person_order.npy"), sort_order(graph.person_ids))
+    np.save(os.path.join(path, "movie_order.npy"), sort_order(graph.movie_ids))
+    np.save(os.path.join(path, "name_order.npy"), sort_order(graph.names, str.lower))
+
+    with open(manifest, "w") as f:
+        json.dump({"version": FORMAT_VERSION,
+                   "sources": source_signature(directory)}, f)
+
+
+def load(directory):
+    """
+    Returns the snapshotted CSRGraph of directory, or None if there
+    is no snapshot or it is out of date.
+    """
+    path = os.path.join(directory, SNAPSHOT_DIRECTORY)
+    try:
+        with open(os.path.join(path, "manifest.json")) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (manifest.get("version") != FORMAT_VERSION or
+            manifest.get("sources") != source_signature(directory)):
+        return None
+
+    def array(name):
+        return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+
+    arrays = {name: array(name) for name in ARRAYS}
+    strings = {name: StringArray(array(name), array(f"{name}_offsets"))
+               for name in STRINGS}
+    graph = CSRGraph(**strings, **arrays)
+    graph._person_lookup = SortedIndex(graph.person_ids, array("person_order"))
+    graph._movie_lookup = SortedIndex(graph.movie_ids, array("movie_order"))
+    graph._name_lookup = SortedIndex(graph.names, array("name_order"),
+                                     str.lower, multiple=True)
+    return graph
@@ -37,3 +37,36 @@ class QueueFrontier(StackFrontier):
         else:
             node = self.frontier.popleft()
             return node
+
+
+class DisjointSet:
+    """
+    Union-find over hashable elements, with union by size and
+    path halving. Elements never passed to union are singletons.
+    """
+    def __init__(self):
+        self.parent = {}
+        self.size = {}
+
+    def find(self, element):
+        parent = self.parent
+        if element not in parent:
+            return element
+        while parent[element] != element:
+            parent[element] = parent[parent[element]]
+            element = parent[element]
+        return element
+
+    def union(self, a, b):
+        for element in (a, b):
+            if element not in self.parent:
+                self.parent[element] = element
+                self.size[element] = 1
+        a = self.find(a)
+        b = self.find(b)
+        if a == b:
+            return
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
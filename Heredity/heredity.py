@@ -45,6 +45,15 @@ def main():
     if len(sys.argv) != 2:
         sys.exit("Usage: python heredity.py data.csv")
     people = load_data(sys.argv[1])
+    probabilities = enumerate_probabilities(people)
+    print_probabilities(people, probabilities)
+
+
+def enumerate_probabilities(people):
+    """
+    Compute the gene and trait distributions of every person by
+    summing the joint probability of every assignment of genes and traits.
+    """
 
     # Keep track of gene and trait probabilities for each person
     probabilities = {
@@ -85,8 +94,10 @@ def main():
 
     # Ensure probabilities sum to 1
     normalize(probabilities)
+    return probabilities
+
 
-    # Print results
+def print_probabilities(people, probabilities):
     for person in people:
         print(f"{person}:")
         for field in probabilities[person]:
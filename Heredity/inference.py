@@ -0,0 +1,288 @@
+"""
+Exact inference for Heredity by message passing on a junction tree.
+
+heredity.py sums the joint probability of every assignment of genes
+and traits, 3^n * 2^n of them for n people. Here the gene count of
+every person is a variable with three values, and the probabilities
+are factors over them: PROBS["gene"] for people without parents, the
+table of inheritanceProbability over the gene counts of a person and
+both parents for the others, and the probability of a known trait
+given the gene count. Unknown traits sum to one and add no factor.
+
+The people are eliminated one at a time, each time the one whose
+neighbours would need the fewest new edges between them. A person and
+its neighbours when it is eliminated form a clique, attached to the
+clique of the first one of those neighbours eliminated after it, which
+gives a junction tree. Messages are passed up the tree and back down,
+and the gene distribution of every person is read from its own clique,
+and the trait distribution from that. The work grows with the number
+of people times 3 to the size of the largest clique, which stays small
+for family trees.
+
+Usage: python inference.py data.csv
+       python inference.py --check data.csv ...
+       python inference.py --benchmark [SIZE ...] [--seed S]
+"""
+
+import argparse
+import itertools
+import random
+import time
+
+import numpy as np
+
+from heredity import (PROBS, enumerate_probabilities, inheritanceProbability,
+                      load_data, print_probabilities)
+
+GENES = (0, 1, 2)
+
+# Largest synthetic pedigree also solved by enumeration in the benchmark
+ENUMERATION_PEOPLE = 6
+
+
+def factors(people, names):
+    """
+    Returns the factors of people as (scope, table) pairs, the scope a
+    tuple of indexes of names and the table an array with an axis per
+    person in the scope.
+    """
+    index = {name: i for i, name in enumerate(names)}
+    result = []
+    for name in names:
+        person = people[name]
+        i = index[name]
+        if person["mother"] is None:
+            result.append(((i,), np.array([PROBS["gene"][g] for g in GENES])))
+        else:
+            table = np.array([[[inheritanceProbability(g, f, m) for g in GENES]
+                               for f in GENES] for m in GENES])
+            result.append(((index[person["mother"]], index[person["father"]], i), table))
+        if person["trait"] is not None:
+            result.append(((i,), np.array([PROBS["trait"][g][person["trait"]]
+                                           for g in GENES])))
+    return result
+
+
+def eliminate(n, scopes):
+    """
+    Returns the cliques of eliminating n variables connected by scopes
+    by the min-fill rule, in the order of elimination. Every clique is
+    a list with the eliminated variable first.
+    """
+    neighbours = [set() for _ in range(n)]
+    for scope in scopes:
+        for v in scope:
+            neighbours[v].update(scope)
+            neighbours[v].discard(v)
+
+    def fill(v):
+        return sum(b not in neighbours[a] for a, b in itertools.combinations(neighbours[v], 2))
+
+    scores = [fill(v) for v in range(n)]
+    remaining = set(range(n))
+    cliques = []
+    while remaining:
+        v = min(remaining, key=lambda v: (scores[v], len(neighbours[v]), v))
+        remaining.discard(v)
+        around = neighbours[v]
+        cliques.append([v] + sorted(around))
+        for a in around:
+            neighbours[a] |= around - {a}
+            neighbours[a].discard(v)
+        changed = set(around)
+        for a in around:
+            changed |= neighbours[a]
+        for a in changed:
+            scores[a] = fill(a)
+    return cliques
+
+
+def expand(table, scope, clique):
+    """
+    Returns table over scope with its axes in the order of clique and
+    an axis of length 1 for every other variable of clique.
+    """
+    order = sorted(range(len(scope)), key=lambda axis: clique.index(scope[axis]))
+    return table.transpose(order).reshape([3 if v in scope else 1 for v in clique])
+
+
+class JunctionTree:
+    """
+    Junction tree of the gene variables of people, as loaded by load_data.
+    """
+
+    def __init__(self, people):
+        self.people = people
+        self.names = list(people)
+        self.factors = factors(people, self.names)
+        self.cliques = eliminate(len(self.names), [scope for scope, _ in self.factors])
+        # Clique of every variable, the one where it was eliminated
+        self.position = {clique[0]: k for k, clique in enumerate(self.cliques)}
+
+        # Cliques after their children, so messages go up in order.
+        self.parent = [min((self.position[v] for v in clique[1:]), default=None)
+                       for clique in self.cliques]
+        self.children = [[] for _ in self.cliques]
+        for k, parent in enumerate(self.parent):
+            if parent is not None:
+                self.children[parent].append(k)
+
+        self.potentials = [np.ones([3] * len(clique)) for clique in self.cliques]
+        for scope, table in self.factors:
+            k = min(self.position[v] for v in scope)
+            self.potentials[k] = self.potentials[k] * expand(table, scope, self.cliques[k])
+
+    def width(self):
+        """
+        Returns the number of variables of the largest clique.
+        """
+        return max(len(clique) for clique in self.cliques)
+
+    def message(self, k, table, to):
+        """
+        Returns table over clique k summed down to the variables it
+        shares with clique to, scaled to sum to one against underflow.
+        """
+        clique = self.cliques[k]
+        # A clique shares all but its first variable with its parent.
+        shared = set(clique[1:]) if to > k else set(self.cliques[to][1:])
+        axes = tuple(axis for axis, v in enumerate(clique) if v not in shared)
+        table = table.sum(axis=axes)
+        return [v for v in clique if v in shared], table / table.sum()
+
+    def gene_distributions(self):
+        """
+        Returns the gene distribution of every person by index of names.
+        """
+        cliques = self.cliques
+        up = [None] * len(cliques)
+        down = [None] * len(cliques)
+        for k, clique in enumerate(cliques):
+            table = self.potentials[k]
+            for child in self.children[k]:
+                table = table * expand(up[child][1], up[child][0], clique)
+            if self.parent[k] is not None:
+                up[k] = self.message(k, table, self.parent[k])
+
+        distributions = [None] * len(cliques)
+        for k in reversed(range(len(cliques))):
+            clique = cliques[k]
+            incoming = [up[child] for child in self.children[k]]
+            if down[k] is not None:
+                incoming.append(down[k])
+            table = self.potentials[k]
+            for scope, message in incoming:
+                table = table * expand(message, scope, clique)
+            gene = table.sum(axis=tuple(range(1, len(clique))))
+            distributions[clique[0]] = gene / gene.sum()
+
+            for child in self.children[k]:
+                rest = self.potentials[k]
+                for scope, message in incoming:
+                    if message is not up[child][1]:
+                        rest = rest * expand(message, scope, clique)
+                down[child] = self.message(k, rest, child)
+        return distributions
+
+    def probabilities(self):
+        """
+        Returns the gene and trait distributions of every person in the
+        form of enumerate_probabilities.
+        """
+        probabilities = {}
+        for name, gene in zip(self.names, self.gene_distributions()):
+            trait = self.people[name]["trait"]
+            if trait is None:
+                p = float(sum(gene[g] * PROBS["trait"][g][True] for g in GENES))
+            else:
+                p = float(trait)
+            probabilities[name] = {
+                "gene": {g: float(gene[g]) for g in (2, 1, 0)},
+                "trait": {True: p, False: 1 - p}
+            }
+        return probabilities
+
+
+def difference(a, b):
+    """
+    Returns the largest difference between two results of probabilities.
+    """
+    return max(abs(a[person][field][value] - b[person][field][value])
+               for person in a for field in a[person] for value in a[person][field])
+
+
+def synthetic_pedigree(n, rng):
+    """
+    Returns n people in the form of load_data, with genes and traits
+    drawn from PROBS and about half of the traits known. Children are
+    born to random couples, and some of them marry someone from outside.
+    """
+    people = {}
+    genes = {}
+
+    def add(mother=None, father=None):
+        name = f"P{len(people)}"
+        if mother is None:
+            weights = [PROBS["gene"][g] for g in GENES]
+        else:
+            weights = [inheritanceProbability(g, genes[father], genes[mother]) for g in GENES]
+        genes[name] = rng.choices(GENES, weights)[0]
+        trait = rng.random() < PROBS["trait"][genes[name]][True]
+        people[name] = {"name": name, "mother": mother, "father": father,
+                        "trait": trait if rng.random() < 0.5 else None}
+        return name
+
+    couples = [(add(), add())]
+    while len(people) < n:
+        mother, father = rng.choice(couples)
+        child = add(mother, father)
+        if len(people) < n and rng.random() < 0.3:
+            spouse = add()
+            couples.append((spouse, child) if rng.random() < 0.5 else (child, spouse))
+    return people
+
+
+def benchmark(sizes, seed):
+    rng = random.Random(seed)
+    for n in sizes:
+        people = synthetic_pedigree(n, rng)
+        start = time.perf_counter()
+        tree = JunctionTree(people)
+        result = tree.probabilities()
+        seconds = time.perf_counter() - start
+        line = f"{n} people: {1000 * seconds:.1f} ms, largest clique {tree.width()}"
+        if n <= ENUMERATION_PEOPLE:
+            start = time.perf_counter()
+            expected = enumerate_probabilities(people)
+            line += (f", enumeration {1000 * (time.perf_counter() - start):.1f} ms, "
+                     f"difference {difference(result, expected):.1e}")
+        print(line)
+
+
+def main():
+    argParser = argparse.ArgumentParser()
+    argParser.add_argument("data", nargs="*")
+    argParser.add_argument("--check", action="store_true",
+                           help="compare with enumeration on every data file")
+    argParser.add_argument("--benchmark", type=int, nargs="*",
+                           help="time synthetic pedigrees of these sizes")
+    argParser.add_argument("--seed", type=int, default=0)
+    args = argParser.parse_args()
+
+    if args.benchmark is not None:
+        benchmark(args.benchmark or [4, 6, 25, 100, 250, 500, 1000], args.seed)
+    elif args.check:
+        for filename in args.data:
+            people = load_data(filename)
+            result = JunctionTree(people).probabilities()
+            print(f"{filename}: largest difference "
+                  f"{difference(result, enumerate_probabilities(people)):.1e}")
+    elif len(args.data) == 1:
+        people = load_data(args.data[0])
+        print_probabilities(people, JunctionTree(people).probabilities())
+    else:
+        argParser.error("give one data file, --check with files or --benchmark")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Enumeration of Heredity with NumPy, many assignments at a time.
+
+Like enumerate_probabilities in heredity.py this goes through every
+assignment of gene counts to all people and of traits to the people
+whose trait is not known, but as integer arrays: assignment c gives
+person i the gene count of digit i of c in base 3, and the unknown
+traits are the bits of c divided by 3^n. The probabilities are kept as
+logarithms in three small tables, the gene count of a person without
+parents, of a child given the gene counts of both parents, and of a
+trait given the gene count, so the joint probability of a chunk of
+assignments is one lookup per table and a sum. The gene and trait
+totals of every person are added up with np.add.at and normalized
+like normalize does. Chunks of CHUNK assignments keep the arrays small.
+
+Usage: python vectorized.py data.csv
+       python vectorized.py --check data.csv ...
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from heredity import (PROBS, enumerate_probabilities, inheritanceProbability,
+                      load_data, print_probabilities)
+
+GENES = (0, 1, 2)
+
+# Assignments handled at once
+CHUNK = 1 << 16
+
+
+def vectorized_probabilities(people, chunk=CHUNK):
+    """
+    Returns the gene and trait distributions of every person
+    in the form of enumerate_probabilities.
+    """
+    names = list(people)
+    n = len(names)
+    index = {name: i for i, name in enumerate(names)}
+    founders = np.array([i for i, name in enumerate(names) if people[name]["mother"] is None],
+                        dtype=np.int64)
+    children = [i for i, name in enumerate(names) if people[name]["mother"] is not None]
+    mothers = np.array([index[people[names[i]]["mother"]] for i in children], dtype=np.int64)
+    fathers = np.array([index[people[names[i]]["father"]] for i in children], dtype=np.int64)
+    children = np.array(children, dtype=np.int64)
+    unknown = np.array([i for i, name in enumerate(names) if people[name]["trait"] is None],
+                       dtype=np.int64)
+    known = np.array([people[name]["trait"] is True for name in names], dtype=np.int64)
+
+    logGene = np.log([PROBS["gene"][g] for g in GENES])
+    logInheritance = np.log([[[inheritanceProbability(g, f, m) for g in GENES]
+                              for f in GENES] for m in GENES])
+    logTrait = np.log([[PROBS["trait"][g][t] for t in (False, True)] for g in GENES])
+
+    powers = 3 ** np.arange(n, dtype=np.int64)
+    bits = np.arange(len(unknown), dtype=np.int64)
+    geneTotals = np.zeros((n, 3))
+    traitTotals = np.zeros((n, 2))
+    rows = np.arange(n)[None, :]
+    total = 3 ** n * 2 ** len(unknown)
+    for start in range(0, total, chunk):
+        assignment = np.arange(start, min(start + chunk, total), dtype=np.int64)
+        genes = assignment[:, None] // powers % 3
+        traits = np.broadcast_to(known, genes.shape).copy()
+        traits[:, unknown] = (assignment // 3 ** n)[:, None] >> bits & 1
+
+        logP = logGene[genes[:, founders]].sum(axis=1)
+        logP += logInheritance[genes[:, mothers], genes[:, fathers], genes[:, children]].sum(axis=1)
+        logP += logTrait[genes, traits].sum(axis=1)
+        p = np.exp(logP)[:, None]
+
+        np.add.at(geneTotals, (rows, genes), p)
+        np.add.at(traitTotals, (rows, traits), p)
+
+    geneTotals /= geneTotals.sum(axis=1, keepdims=True)
+    traitTotals /= traitTotals.sum(axis=1, keepdims=True)
+    return {
+        name: {
+            "gene": {g: float(geneTotals[i, g]) for g in (2, 1, 0)},
+            "trait": {True: float(traitTotals[i, 1]), False: float(traitTotals[i, 0])}
+        }
+        for i, name in enumerate(names)
+    }
+
+
+def main():
+    argParser = argparse.ArgumentParser()
+    argParser.add_argument("data", nargs="+")
+    argParser.add_argument("--check", action="store_true",
+                           help="compare with enumerate_probabilities on every data file")
+    args = argParser.parse_args()
+
+    if not args.check:
+        if len(args.data) != 1:
+            argParser.error("give one data file without --check")
+        people = load_data(args.data[0])
+        print_probabilities(people, vectorized_probabilities(people))
+        return
+
+    for filename in args.data:
+        people = load_data(filename)
+        start = time.perf_counter()
+        result = vectorized_probabilities(people)
+        vectorizedSeconds = time.perf_counter() - start
+        start = time.perf_counter()
+        expected = enumerate_probabilities(people)
+        seconds = time.perf_counter() - start
+        difference = max(abs(result[person][field][value] - expected[person][field][value])
+                         for person in result for field in result[person]
+                         for value in result[person][field])
+        print(f"{filename}: {1000 * vectorizedSeconds:.1f} ms against "
+              f"{1000 * seconds:.1f} ms, largest difference {difference:.1e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,11 @@
+import functools
 import math
 import random
 import time
 
+# Number of pile states whose actions are cached
+ACTION_CACHE = 1 << 16
+
 
 class Nim():
 
@@ -25,12 +29,11 @@ class Nim():
 
         Action `(i, j)` represents the action of removing `j` items
         from pile `i` (where piles are 0-indexed).
+
+        The actions are cached by piles, so the same frozenset
+        is returned every time for the same piles.
         """
-        actions = set()
-        for i, pile in enumerate(piles):
-            for j in range(1, pile + 1):
-                actions.add((i, j))
-        return actions
+        return _available_actions(tuple(piles))
 
     @classmethod
     def other_player(cls, player):
@@ -70,6 +73,12 @@ class Nim():
             self.winner = self.player
 
 
+@functools.lru_cache(maxsize=ACTION_CACHE)
+def _available_actions(piles):
+    return frozenset((i, j) for i, pile in enumerate(piles)
+                     for j in range(1, pile + 1))
+
+
 class NimAI():
 
     def __init__(self, alpha=0.5, epsilon=0.1):
@@ -81,8 +90,13 @@ class NimAI():
         pairs to a Q-value (a number).
          - `state` is a tuple of remaining piles, e.g. (1, 1, 4, 4)
          - `action` is a tuple `(i, j)` for an action
+
+        `self.best` maps states to their best action and its Q-value,
+        see `best_q`. It is kept up to date by `update_q_value`, so
+        clear it if `self.q` is changed some other way.
         """
         self.q = dict()
+        self.best = dict()
         self.alpha = alpha
         self.epsilon = epsilon
 
@@ -122,7 +136,39 @@ class NimAI():
         `alpha` is the learning rate, and `new value estimate`
         is the sum of the current reward and estimated future rewards.
         """
-        self.q[(tuple(state), action)] = old_q + self.alpha * (reward + future_rewards - old_q)
+        state = tuple(state)
+        new_q = old_q + self.alpha * (reward + future_rewards - old_q)
+        self.q[(state, action)] = new_q
+
+        # Keep the best action of the state. If the best one got worse
+        # another one may be better now, so it is looked up again later.
+        best = self.best.get(state)
+        if best is not None:
+            if action == best[0]:
+                if new_q >= best[1]:
+                    self.best[state] = (action, new_q)
+                else:
+                    del self.best[state]
+            elif new_q > best[1]:
+                self.best[state] = (action, new_q)
+
+    def best_q(self, state):
+        """
+        Returns the best action in state `state` and its Q-value, using
+        0 for pairs that have no Q-values, or (None, 0) if there are no
+        available actions. Found by going through the actions only when
+        the state is not in `self.best`.
+        """
+        state = tuple(state)
+        best = self.best.get(state)
+        if best is None:
+            best = (None, 0)
+            for action in Nim.available_actions(state):
+                value = self.q.get((state, action), 0)
+                if best[0] is None or value > best[1]:
+                    best = (action, value)
+            self.best[state] = best
+        return best
 
     def best_future_reward(self, state):
         """
@@ -134,15 +180,7 @@ class NimAI():
         Q-value in `self.q`. If there are no available actions in
         `state`, return 0.
         """
-        # Using list comprehension to build a list of all possible
-        # rewards. Information about the actions that lead to these
-        # rewards is not saved here.
-        rewards = [self.get_q_value(state, action) for action in Nim.available_actions(state)]
-        if len(rewards) == 0:
-            return 0
-        else:
-            return max(rewards)
-        
+        return self.best_q(state)[1]
 
     def choose_action(self, state, epsilon=True):
         """
@@ -159,19 +197,16 @@ class NimAI():
         If multiple actions have the same Q-value, any of those
         options is an acceptable return value.
         """
-        # Building a dictionary with actions as keys and their
-        # Q-values in this state as values.
-        actions = {action: self.get_q_value(state,tuple(action))
-                    for action in Nim.available_actions(state)}
-        # Finding the action with highest Q-value.
-        best_action = max(actions, key=actions.get)
-        
+        # The best action is kept by best_q, so the actions
+        # only need to be listed for a random one.
+        best_action = self.best_q(state)[0]
+
         if epsilon:
             # random.random() gives a sample from uniform distribution between in range [0,1]
             # Comparing this value to epsilon gives us a boolean with the epsilon probability
             # of returning True
             if random.random() <= self.epsilon:
-                return random.choice(list(actions))
+                return random.choice(list(Nim.available_actions(state)))
 
         # In all other cases the best alternative is picked.
         return best_action
@@ -179,17 +214,22 @@ class NimAI():
 
 
 
-def train(n):
+def train(n, verbose=True, player=None, initial=None):
     """
     Train an AI by playing `n` games against itself.
+    Progress is printed if `verbose` is True. A NimAI given
+    as `player` is trained further instead of a new one.
+    Games start from the piles `initial` if it is given.
     """
 
-    player = NimAI()
+    if player is None:
+        player = NimAI()
 
     # Play n games
     for i in range(n):
-        print(f"Playing training game {i + 1}")
-        game = Nim()
+        if verbose:
+            print(f"Playing training game {i + 1}")
+        game = Nim() if initial is None else Nim(initial)
 
         # Keep track of last move made by either player
         last = {
@@ -232,13 +272,14 @@ def train(n):
                     0
                 )
 
-    print("Done training")
+    if verbose:
+        print("Done training")
 
     # Return the trained AI
     return player
 
 
-def play(ai, human_player=None):
+def play(ai, human_player=None, initial=None):
     """
     Play human game against the AI.
     `human_player` can be set to 0 or 1 to specify whether
@@ -250,7 +291,7 @@ def play(ai, human_player=None):
         human_player = random.randint(0, 1)
 
     # Create new game
-    game = Nim()
+    game = Nim() if initial is None else Nim(initial)
 
     # Game loop
     while True:
@@ -0,0 +1,140 @@
+"""
+Trains Nim AIs in parallel and merges what they learn.
+
+Every round each of --workers agents plays --games games of self-play
+with its own copy of the shared Q-table, in a process pool. After the
+round the tables are merged into the shared table, by the mean of the
+agents that have a value or by the largest value, and the next round
+starts from the merged table. Each agent seeds its random moves from
+the seed, its number and the round, so results do not depend on which
+process runs it.
+
+After every round the greedy AI of the shared table plays against
+random moves, and the same number of games of the single process
+train() are measured the same way, to compare how fast both learn
+against wall clock time.
+
+Usage: python parallel.py [--workers N] [--rounds R] [--games G]
+                          [--merge {mean,max}] [--seed S]
+"""
+
+import argparse
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from nim import Nim, NimAI, train
+
+# Games against random moves, from both sides, of every evaluation
+EVALUATION_GAMES = 500
+
+
+def train_agent(q, games, seed):
+    """
+    Trains a copy of Q-table q with games games of self-play
+    and returns it. Runs in the worker processes.
+    """
+    random.seed(seed)
+    agent = NimAI()
+    agent.q = dict(q)
+    return train(games, verbose=False, player=agent).q
+
+
+def merge(tables, how="mean"):
+    """
+    Returns one Q-table of tables, with the mean or the largest
+    of the values of every (state, action) pair that has one.
+    """
+    totals = dict()
+    counts = dict()
+    for table in tables:
+        for key, value in table.items():
+            if key not in totals:
+                totals[key] = value
+                counts[key] = 1
+            elif how == "max":
+                totals[key] = max(totals[key], value)
+            else:
+                totals[key] += value
+                counts[key] += 1
+    if how == "max":
+        return totals
+    return {key: total / counts[key] for key, total in totals.items()}
+
+
+def win_rate(q, games=EVALUATION_GAMES):
+    """
+    Returns the share of games the greedy AI with Q-table q wins
+    against random moves, playing first in half of them.
+    """
+    ai = NimAI()
+    ai.q = q
+    rng = random.Random(0)
+    wins = 0
+    for number in range(games):
+        aiPlayer = number % 2
+        game = Nim()
+        while game.winner is None:
+            if game.player == aiPlayer:
+                action = ai.choose_action(game.piles, epsilon=False)
+            else:
+                action = rng.choice(sorted(Nim.available_actions(game.piles)))
+            game.move(action)
+        wins += game.winner == aiPlayer
+    return wins / games
+
+
+def train_parallel(workers, rounds, games, how="mean", seed=0):
+    """
+    Trains in rounds as described above. Yields the total number of
+    games, the training time so far and the merged Q-table after every round.
+    """
+    q = dict()
+    seconds = 0
+    with ProcessPoolExecutor(workers) as executor:
+        for number in range(rounds):
+            start = time.perf_counter()
+            seeds = [(seed * rounds + number) * workers + agent for agent in range(workers)]
+            tables = list(executor.map(train_agent, [q] * workers, [games] * workers, seeds))
+            q = merge(tables, how)
+            seconds += time.perf_counter() - start
+            yield (number + 1) * workers * games, seconds, q
+
+
+def train_single(rounds, games, seed=0):
+    """
+    Trains one AI with train() as many games per round as
+    train_parallel in total, yielding the same figures.
+    """
+    random.seed(seed)
+    ai = NimAI()
+    seconds = 0
+    for number in range(rounds):
+        start = time.perf_counter()
+        train(games, verbose=False, player=ai)
+        seconds += time.perf_counter() - start
+        yield (number + 1) * games, seconds, ai.q
+
+
+def main():
+    argParser = argparse.ArgumentParser()
+    argParser.add_argument("--workers", type=int, default=4)
+    argParser.add_argument("--rounds", type=int, default=10)
+    argParser.add_argument("--games", type=int, default=500,
+                           help="games of every agent in a round")
+    argParser.add_argument("--merge", choices=("mean", "max"), default="mean")
+    argParser.add_argument("--seed", type=int, default=0)
+    args = argParser.parse_args()
+
+    print(f"{args.workers} agents, merged by {args.merge}:")
+    for total, seconds, q in train_parallel(args.workers, args.rounds, args.games,
+                                            args.merge, args.seed):
+        print(f"  {total} games in {seconds:.2f} s, win rate {win_rate(q):.3f}")
+
+    print("Single process:")
+    for total, seconds, q in train_single(args.rounds, args.workers * args.games, args.seed):
+        print(f"  {total} games in {seconds:.2f} s, win rate {win_rate(q):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,41 @@
+"""
+Play Nim against the AI.
+
+The AI is loaded from the Q-table file --table when it exists, and
+otherwise trained with 10 000 games and saved there. --train N plays N
+more training games with a loaded AI before playing, and saves it again.
+
+Usage: python play.py [--table FILE] [--train N]
+"""
+
+import argparse
+import os
+import time
+
 from nim import train, play
+from qtable import load_ai, save_ai
+
+TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "nimai.bin")
+
+argParser = argparse.ArgumentParser()
+argParser.add_argument("--table", default=TABLE_FILE, help="Q-table file to load and save")
+argParser.add_argument("--train", type=int, default=0,
+                       help="training games to play on top of a loaded AI")
+args = argParser.parse_args()
+
+if os.path.exists(args.table):
+    start = time.perf_counter()
+    ai, initial = load_ai(args.table)
+    print(f"Loaded {len(ai.q)} Q-values from {args.table} "
+          f"in {1000 * (time.perf_counter() - start):.1f} ms")
+    if args.train:
+        train(args.train, verbose=False, player=ai, initial=initial)
+        save_ai(ai, args.table, initial)
+else:
+    initial = [1, 3, 5, 7]
+    ai = train(10000, initial=initial)
+    save_ai(ai, args.table, initial)
 
-ai = train(10000)
 peer_grading_mode = False
 for _ in range(5 if peer_grading_mode else 1):
-    play(ai, 0)
+    play(ai, 0, initial)
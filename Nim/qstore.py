@@ -0,0 +1,350 @@
+"""
+Bounded Q-values for Nim with many or large piles.
+
+NimAI keeps its Q-values in a dict of ((state, action) -> value), where
+every entry holds a tuple of tuples and a float object, and which grows
+without bound. QStore packs every (state, action) pair into one integer,
+the state numbered like in qtable.Encoding times the number of actions
+plus the number of the action, and keeps the keys, values, visit counts
+and the time of last use in flat arrays forming a hash table with linear
+probing. Entries are removed by shifting the entries after them back, so
+the table needs no tombstones.
+
+When capacity entries are stored, adding one more evicts another: of
+SAMPLES entries picked at random the least recently used one, or with
+eviction "visits" the least visited one. Without eviction the table
+grows instead, doubling its arrays. BoundedNimAI is a NimAI using a
+QStore.
+
+Usage: python qstore.py [--piles N ...] [--games N] [--capacity N]
+                        [--eviction {lru,visits,none}] [--seed S]
+"""
+
+import argparse
+import random
+import sys
+import time
+from array import array
+
+from nim import Nim, NimAI, train
+
+# Free slots have this key
+EMPTY = -1
+
+# Largest share of the slots in use
+LOAD_FACTOR = 0.75
+
+# Entries compared when one is evicted
+SAMPLES = 8
+
+# Multiplier of Fibonacci hashing, 2^64 divided by the golden ratio
+GOLDEN = 0x9E3779B97F4A7C15
+MASK64 = (1 << 64) - 1
+
+
+class QStore:
+    """
+    Q-values of the (state, action) pairs of a game starting from
+    initial, holding at most capacity entries, or any number if
+    capacity or eviction is None. Can be used in place of the dict NimAI.q.
+    """
+
+    def __init__(self, initial, capacity=None, eviction="lru"):
+        if eviction not in ("lru", "visits", None):
+            raise ValueError(f"Unknown eviction {eviction}")
+        self.initial = tuple(initial)
+        self.strides = []
+        stride = 1
+        for pile in reversed(self.initial):
+            self.strides.append(stride)
+            stride *= pile + 1
+        self.strides.reverse()
+        self.action_index = {}
+        for i, pile in enumerate(self.initial):
+            for j in range(1, pile + 1):
+                self.action_index[(i, j)] = len(self.action_index)
+        self.action_list = list(self.action_index)
+        self.actions = len(self.action_list)
+        if stride * self.actions >= 1 << 63:
+            raise ValueError(f"{len(self.initial)} piles of these sizes do not fit in 64 bits")
+
+        self.capacity = capacity
+        # Without a capacity there is nothing to evict for.
+        self.eviction = eviction if capacity else None
+        self.rng = random.Random(0)
+        # Called with the (state, action) pair of every evicted entry
+        self.on_evict = None
+        self.evictions = 0
+        self.clock = 0
+        self.size = 0
+        slots = 8
+        while capacity and slots * LOAD_FACTOR < capacity:
+            slots *= 2
+        self._allocate(slots)
+
+    def _allocate(self, slots):
+        self.bits = slots.bit_length() - 1
+        self.shift = 64 - self.bits
+        self.mask = slots - 1
+        self.keys = array("q", [EMPTY]) * slots
+        self.values = array("d", [0.0]) * slots
+        self.visits = array("I", [0]) * slots
+        self.used = array("q", [0]) * slots
+
+    def state_key(self, state):
+        """
+        Returns the packed key of the first action of state. The key of
+        action (i, j) is this plus action_index[(i, j)].
+        """
+        return sum(pile * stride for pile, stride in zip(state, self.strides)) * self.actions
+
+    def key(self, pair):
+        state, action = pair
+        return self.state_key(state) + self.action_index[action]
+
+    def unpack(self, key):
+        """
+        Returns the (state, action) pair of a packed key.
+        """
+        stateNumber, a = divmod(key, self.actions)
+        state = tuple(stateNumber // stride % (pile + 1)
+                      for pile, stride in zip(self.initial, self.strides))
+        return state, self.action_list[a]
+
+    def _home(self, key):
+        return (key * GOLDEN & MASK64) >> self.shift
+
+    def _find(self, key):
+        """
+        Returns the slot of key, or the free slot where it would go.
+        """
+        keys = self.keys
+        mask = self.mask
+        slot = self._home(key)
+        while True:
+            found = keys[slot]
+            if found == key or found == EMPTY:
+                return slot
+            slot = (slot + 1) & mask
+
+    def get_packed(self, key, default=None):
+        slot = self._find(key)
+        if self.keys[slot] == EMPTY:
+            return default
+        self.clock += 1
+        self.used[slot] = self.clock
+        return self.values[slot]
+
+    def best_action(self, state, actions):
+        """
+        Returns the one of actions with the highest value in state and
+        the value, 0 for actions with no value, or (None, 0) if there
+        are no actions. Does the lookups of get_packed in one loop.
+        """
+        keys, values, used = self.keys, self.values, self.used
+        mask, home = self.mask, self._home
+        base = self.state_key(state)
+        index = self.action_index
+        self.clock += 1
+        clock = self.clock
+        best = (None, 0)
+        for action in actions:
+            key = base + index[action]
+            slot = home(key)
+            while True:
+                found = keys[slot]
+                if found == key:
+                    value = values[slot]
+                    used[slot] = clock
+                    break
+                if found == EMPTY:
+                    value = 0
+                    break
+                slot = (slot + 1) & mask
+            if best[0] is None or value > best[1]:
+                best = (action, value)
+        return best
+
+    def set_packed(self, key, value):
+        slot = self._find(key)
+        if self.keys[slot] == EMPTY:
+            if self.eviction is not None and self.size >= self.capacity:
+                self._evict()
+                slot = self._find(key)
+            elif self.eviction is None and self.size + 1 > len(self.keys) * LOAD_FACTOR:
+                self._allocate_more()
+                slot = self._find(key)
+            self.keys[slot] = key
+            self.visits[slot] = 0
+            self.size += 1
+        self.clock += 1
+        self.values[slot] = value
+        self.visits[slot] += 1
+        self.used[slot] = self.clock
+
+    def _allocate_more(self):
+        """
+        Doubles the arrays and adds the entries back.
+        """
+        keys, values, visits, used = self.keys, self.values, self.visits, self.used
+        self._allocate(2 * len(keys))
+        for old, key in enumerate(keys):
+            if key != EMPTY:
+                slot = self._find(key)
+                self.keys[slot] = key
+                self.values[slot] = values[old]
+                self.visits[slot] = visits[old]
+                self.used[slot] = used[old]
+
+    def _evict(self):
+        """
+        Removes the least recently used or least visited of SAMPLES random entries.
+        """
+        keys = self.keys
+        order = self.visits if self.eviction == "visits" else self.used
+        victim = None
+        found = 0
+        while found < SAMPLES:
+            slot = self.rng.getrandbits(self.bits)
+            if keys[slot] != EMPTY:
+                found += 1
+                if victim is None or (order[slot], self.used[slot]) < (order[victim], self.used[victim]):
+                    victim = slot
+        key = keys[victim]
+        self._remove(victim)
+        self.evictions += 1
+        if self.on_evict is not None:
+            self.on_evict(self.unpack(key))
+
+    def _remove(self, slot):
+        """
+        Empties slot and moves back the entries after it that would
+        no longer be found.
+        """
+        keys = self.keys
+        mask = self.mask
+        hole = slot
+        slot = (slot + 1) & mask
+        while keys[slot] != EMPTY:
+            home = self._home(keys[slot])
+            # The entry moves to the hole unless its home is between the hole and it.
+            if (home <= hole < slot) or (slot < home <= hole) or (hole < slot < home):
+                keys[hole] = keys[slot]
+                self.values[hole] = self.values[slot]
+                self.visits[hole] = self.visits[slot]
+                self.used[hole] = self.used[slot]
+                hole = slot
+            slot = (slot + 1) & mask
+        keys[hole] = EMPTY
+        self.size -= 1
+
+    def get(self, pair, default=None):
+        return self.get_packed(self.key(pair), default)
+
+    def __getitem__(self, pair):
+        value = self.get(pair)
+        if value is None:
+            raise KeyError(pair)
+        return value
+
+    def __setitem__(self, pair, value):
+        self.set_packed(self.key(pair), value)
+
+    def __contains__(self, pair):
+        return self.keys[self._find(self.key(pair))] != EMPTY
+
+    def __len__(self):
+        return self.size
+
+    def items(self):
+        for key, value in zip(self.keys, self.values):
+            if key != EMPTY:
+                yield self.unpack(key), value
+
+    def visit_count(self, pair):
+        """
+        Returns the number of times the value of pair was set, 0 if it is not stored.
+        """
+        slot = self._find(self.key(pair))
+        return self.visits[slot] if self.keys[slot] != EMPTY else 0
+
+    def nbytes(self):
+        return sum(len(a) * a.itemsize for a in (self.keys, self.values, self.visits, self.used))
+
+
+class BoundedNimAI(NimAI):
+    """
+    NimAI with its Q-values in a QStore. self.best holds the best actions
+    of at most capacity states and is emptied when it is full. A state
+    is dropped from it when one of its entries is evicted, since the
+    value of the action is 0 again.
+    """
+
+    def __init__(self, initial, capacity=None, eviction="lru", alpha=0.5, epsilon=0.1):
+        super().__init__(alpha, epsilon)
+        self.q = QStore(initial, capacity, eviction)
+        self.q.on_evict = self.forget
+
+    def forget(self, pair):
+        self.best.pop(pair[0], None)
+
+    def best_q(self, state):
+        state = tuple(state)
+        best = self.best.get(state)
+        if best is None:
+            if self.q.eviction is not None and len(self.best) >= self.q.capacity:
+                self.best.clear()
+            best = self.q.best_action(state, Nim.available_actions(state))
+            self.best[state] = best
+        return best
+
+
+def dict_bytes(q):
+    """
+    Returns the bytes of the dict q and of the objects of its entries.
+    """
+    seen = set()
+    total = sys.getsizeof(q)
+    stack = [item for pair in q.items() for item in pair]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, tuple):
+            stack.extend(item)
+    return total
+
+
+def main():
+    argParser = argparse.ArgumentParser()
+    argParser.add_argument("--piles", type=int, nargs="+", default=list(range(1, 11)))
+    argParser.add_argument("--games", type=int, default=5000)
+    argParser.add_argument("--capacity", type=int, default=10000,
+                           help="most Q-values kept, the starting size without eviction")
+    argParser.add_argument("--eviction", choices=("lru", "visits", "none"), default="lru")
+    argParser.add_argument("--seed", type=int, default=0)
+    args = argParser.parse_args()
+    eviction = None if args.eviction == "none" else args.eviction
+
+    random.seed(args.seed)
+    start = time.perf_counter()
+    ai = train(args.games, verbose=False, initial=args.piles,
+               player=BoundedNimAI(args.piles, args.capacity, eviction))
+    seconds = time.perf_counter() - start
+    q = ai.q
+    print(f"QStore: {args.games / seconds:.0f} games/s, {len(q)} Q-values, "
+          f"{q.evictions} evicted, {q.nbytes() / len(q):.1f} bytes per Q-value, "
+          f"{q.nbytes() / len(q.keys):.0f} bytes per slot")
+
+    random.seed(args.seed)
+    start = time.perf_counter()
+    ai = train(args.games, verbose=False, initial=args.piles)
+    seconds = time.perf_counter() - start
+    print(f"dict: {args.games / seconds:.0f} games/s, {len(ai.q)} Q-values, "
+          f"{dict_bytes(ai.q) / len(ai.q):.1f} bytes per Q-value")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+Q-learning for Nim on a NumPy Q-table, many games at a time.
+
+Every pile state is numbered like a number with digits that are the
+pile sizes, and every action (i, j) by its place in the list of all
+actions of the initial piles, so the Q-values are a dense array with a
+row per state and a column per action. BatchTrainer plays many games
+of self-play in lockstep, choosing the moves of all of them at once
+with epsilon-greedy selection and updating the Q-values of all of them
+at once. The learned values can be exported as a NimAI for play().
+
+save_ai and load_ai store the Q-values of a NimAI in a binary file
+using the same numbering: a header with the initial piles, alpha and
+epsilon, and then one float64 per (state, action) pair, NaN for pairs
+that have no Q-value.
+"""
+
+import argparse
+import os
+import pickle
+import struct
+import tempfile
+import time
+
+import numpy as np
+
+from nim import NimAI
+
+MAGIC = b"NIMQ"
+FORMAT_VERSION = 2
+
+
+class Encoding:
+    """
+    Numbers the pile states and actions of a game starting from initial.
+    """
+
+    def __init__(self, initial=(1, 3, 5, 7)):
+        self.initial = tuple(initial)
+        radix = np.array(self.initial, dtype=np.int64) + 1
+        self.strides = np.ones(len(radix), dtype=np.int64)
+        self.strides[:-1] = np.cumprod(radix[::-1])[::-1][1:]
+        self.states = int(np.prod(radix))
+        self.actions = [(i, j) for i, pile in enumerate(self.initial)
+                        for j in range(1, pile + 1)]
+        self.action_index = {action: a for a, action in enumerate(self.actions)}
+        self.start = self.state(self.initial)
+
+        # Piles of every state, and which actions are possible
+        # in every state and where they lead.
+        states = np.arange(self.states)
+        self.piles = (states[:, None] // self.strides) % radix
+        actionPiles = np.array([i for i, _ in self.actions])
+        actionCounts = np.array([j for _, j in self.actions])
+        self.valid = self.piles[:, actionPiles] >= actionCounts
+        self.next = np.where(self.valid,
+                             states[:, None] - actionCounts * self.strides[actionPiles], -1)
+        # Possible actions of every state first in its row, and their number
+        self.action_counts = self.valid.sum(axis=1)
+        self.state_actions = np.argsort(~self.valid, axis=1, kind="stable")
+
+    def state(self, piles):
+        """
+        Returns the number of the state with piles.
+        """
+        return int(np.dot(piles, self.strides))
+
+    def state_piles(self, state):
+        return self.piles[state].tolist()
+
+
+class BatchTrainer:
+    """
+    Trains Q-values for Nim from initial like nim.train, but playing
+    lanes games in lockstep. When several games update the same value
+    in one step, the value moves towards the mean of their estimates.
+    """
+
+    def __init__(self, initial=(1, 3, 5, 7), alpha=0.5, epsilon=0.1,
+                 lanes=4096, seed=None):
+        self.encoding = Encoding(initial)
+        self.alpha = alpha
+        self.epsilon = epsilon
+        self.lanes = lanes
+        self.rng = np.random.default_rng(seed)
+        # Actions that are not possible in a state have the value -inf.
+        self.q = np.where(self.encoding.valid, 0.0, -np.inf)
+        # Times every value was updated. Values never updated are left
+        # out of the exported NimAI, like those missing from its dict.
+        self.visits = np.zeros(self.q.shape, dtype=np.int64)
+        self.games = 0
+
+    def best_future_rewards(self):
+        """
+        Returns the highest Q-value of every state, 0 for states with no actions.
+        """
+        values = self.q.max(axis=1)
+        values[np.isinf(values)] = 0
+        return values
+
+    def best_actions(self):
+        """
+        Returns the action with the highest Q-value in every state,
+        breaking ties at random.
+        """
+        best = self.q == self.q.max(axis=1, keepdims=True)
+        return np.argmax(np.where(best, self.rng.random(self.q.shape), -1), axis=1)
+
+    def choose_actions(self, states, epsilon=True):
+        """
+        Returns an action for every one of states, the best one or with
+        probability epsilon a random one.
+        """
+        actions = self.best_actions()[states]
+        if epsilon:
+            explore = np.flatnonzero(self.rng.random(len(states)) < self.epsilon)
+            exploring = states[explore]
+            picks = (self.rng.random(len(explore)) *
+                     self.encoding.action_counts[exploring]).astype(np.int64)
+            actions[explore] = self.encoding.state_actions[exploring, picks]
+        return actions
+
+    def learn(self, states, actions, targets):
+        """
+        Move the values of (states, actions) towards targets, the reward
+        plus the best future reward of each.
+        """
+        if len(states) == 0:
+            return
+        flat = states * self.q.shape[1] + actions
+        keys, inverse = np.unique(flat, return_inverse=True)
+        counts = np.bincount(inverse)
+        means = np.bincount(inverse, weights=targets) / counts
+        rows, columns = np.divmod(keys, self.q.shape[1])
+        self.q[rows, columns] += self.alpha * (means - self.q[rows, columns])
+        self.visits[rows, columns] += counts
+
+    def train(self, n):
+        """
+        Play n more games of self-play and return self.
+        """
+        encoding = self.encoding
+        started = min(self.lanes, n)
+        state = np.full(started, encoding.start)
+        player = np.zeros(started, dtype=np.int64)
+        # State and action of the last move of both players of every game
+        lastState = np.full((started, 2), -1)
+        lastAction = np.full((started, 2), -1)
+
+        while len(state):
+            lanes = np.arange(len(state))
+            action = self.choose_actions(state)
+            lastState[lanes, player] = state
+            lastAction[lanes, player] = action
+            newState = encoding.next[state, action]
+            over = newState == 0
+            other = 1 - player
+            future = self.best_future_rewards()[newState]
+
+            # The player who took the last object loses, and the
+            # other player's last move gets the reward of the result.
+            previous = lastState[lanes, other] >= 0
+            self.learn(
+                np.concatenate([state[over], lastState[lanes, other][previous]]),
+                np.concatenate([action[over], lastAction[lanes, other][previous]]),
+                np.concatenate([-1 + future[over], over[previous] + future[previous]]))
+
+            state = newState
+            player = other
+            finished = np.flatnonzero(over)
+            self.games += len(finished)
+
+            # Start new games in the lanes of finished ones while games are left.
+            restart = finished[:max(0, n - started)]
+            started += len(restart)
+            state[restart] = encoding.start
+            player[restart] = 0
+            lastState[restart] = -1
+            lastAction[restart] = -1
+            keep = np.ones(len(state), dtype=bool)
+            keep[finished[len(restart):]] = False
+            state, player = state[keep], player[keep]
+            lastState, lastAction = lastState[keep], lastAction[keep]
+        return self
+
+    def to_ai(self):
+        """
+        Returns a NimAI with the learned Q-values.
+        """
+        ai = NimAI(self.alpha, self.epsilon)
+        for state, action in zip(*np.nonzero(self.visits)):
+            ai.q[(tuple(self.encoding.state_piles(state)),
+                  self.encoding.actions[action])] = float(self.q[state, action])
+        return ai
+
+
+def save_ai(ai, filename, initial=(1, 3, 5, 7)):
+    """
+    Write the Q-values of ai, trained on games starting from initial, to filename.
+    """
+    encoding = Encoding(initial)
+    values = np.full((encoding.states, len(encoding.actions)), np.nan)
+    strides = encoding.strides.tolist()
+    for (state, action), value in ai.q.items():
+        values[sum(pile * stride for pile, stride in zip(state, strides)),
+               encoding.action_index[action]] = value
+    with open(filename, "wb") as f:
+        f.write(struct.pack("<4sHH", MAGIC, FORMAT_VERSION, len(encoding.initial)))
+        f.write(struct.pack(f"<{len(encoding.initial)}H", *encoding.initial))
+        f.write(struct.pack("<dd", ai.alpha, ai.epsilon))
+        f.write(values.tobytes())
+
+
+def load_ai(filename):
+    """
+    Returns the NimAI written to filename by save_ai, and the initial piles.
+    """
+    with open(filename, "rb") as f:
+        data = f.read()
+    magic, version, count = struct.unpack_from("<4sHH", data)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError(f"{filename} is not a Q-table of this version")
+    initial = struct.unpack_from(f"<{count}H", data, 8)
+    offset = 8 + 2 * count
+    alpha, epsilon = struct.unpack_from("<dd", data, offset)
+    encoding = Encoding(initial)
+    values = np.frombuffer(data, dtype=np.float64, offset=offset + 16)
+    values = values.reshape(encoding.states, len(encoding.actions))
+
+    ai = NimAI(alpha, epsilon)
+    states, actions = np.nonzero(~np.isnan(values))
+    piles = [tuple(row) for row in encoding.piles[states].tolist()]
+    ai.q = {(state, encoding.actions[action]): value for state, action, value
+            in zip(piles, actions.tolist(), values[states, actions].tolist())}
+    return ai, list(initial)
+
+
+def compare_formats(ai, initial):
+    """
+    Prints the size and load time of ai saved by save_ai and by pickle.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        binary = os.path.join(directory, "q.bin")
+        pickled = os.path.join(directory, "q.pickle")
+        save_ai(ai, binary, initial)
+        with open(pickled, "wb") as f:
+            pickle.dump(ai.q, f)
+
+        def load_pickle(filename):
+            with open(filename, "rb") as f:
+                return pickle.load(f)
+
+        for name, filename, load in (("Binary", binary, load_ai),
+                                     ("Pickle", pickled, load_pickle)):
+            times = []
+            for _ in range(5):
+                start = time.perf_counter()
+                load(filename)
+                times.append(time.perf_counter() - start)
+            print(f"{name}: {os.path.getsize(filename)} bytes, "
+                  f"loaded in {1000 * min(times):.2f} ms")
+
+
+def main():
+    argParser = argparse.ArgumentParser()
+    argParser.add_argument("--games", type=int, default=1000000)
+    argParser.add_argument("--lanes", type=int, default=4096)
+    argParser.add_argument("--piles", type=int, nargs="+", default=[1, 3, 5, 7])
+    argParser.add_argument("--seed", type=int, default=None)
+    argParser.add_argument("--save", help="write the Q-values here for play.py")
+    args = argParser.parse_args()
+
+    start = time.perf_counter()
+    trainer = BatchTrainer(args.piles, lanes=args.lanes, seed=args.seed).train(args.games)
+    seconds = time.perf_counter() - start
+    print(f"Trained {trainer.games} games in {seconds:.2f} s, "
+          f"{trainer.games / seconds:.0f} games/s, "
+          f"{np.count_nonzero(trainer.visits)} Q-values.")
+    if args.save is not None:
+        ai = trainer.to_ai()
+        save_ai(ai, args.save, args.piles)
+        compare_formats(ai, args.piles)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Exact solution of Nim, to check what the AI learns.
+
+In this Nim the player who takes the last object loses. Solver finds
+whether the player to move wins every pile state of a game starting
+from initial by going through the states from the fewest objects up:
+a state is won if some action leads to a state that is lost for the
+other player, and the empty state is won, since the other player took
+the last object. nim_sum_wins gives the same answer in constant time:
+the player to move wins if the nim-sum of the piles is not zero,
+except when no pile has more than one object, when the player to move
+wins if the number of piles left is even.
+
+A greedy action is optimal if it leads to a lost state for the other
+player, or if there is no such action, when every action is as good.
+percent_optimal scores an AI by the share of won states where it plays
+a winning action, since in lost states any action would count, and
+train_until trains until that share is reached.
+
+Usage: python solver.py [--piles N ...] [--interval N] [--games N]
+                        [--target P] [--seed S]
+"""
+
+import argparse
+import functools
+import random
+import time
+
+import numpy as np
+
+from nim import NimAI, train
+from qtable import Encoding
+
+
+def nim_sum_wins(piles):
+    """
+    Returns True if the player to move in piles wins with perfect play.
+    """
+    if max(piles, default=0) <= 1:
+        return sum(piles) % 2 == 0
+    return functools.reduce(lambda a, b: a ^ b, piles) != 0
+
+
+class Solver:
+    """
+    Whether the player to move wins, and the winning actions,
+    of every pile state of a game starting from initial.
+    """
+
+    def __init__(self, initial=(1, 3, 5, 7)):
+        self.encoding = encoding = Encoding(initial)
+        # Actions only lead to states with fewer objects, so the states of
+        # every number of objects are solved at once, fewest first.
+        objects = encoding.piles.sum(axis=1)
+        self.wins = np.zeros(encoding.states, dtype=bool)
+        self.wins[0] = True
+        for level in range(1, objects.max() + 1):
+            states = np.flatnonzero(objects == level)
+            nextWins = self.wins[np.maximum(encoding.next[states], 0)]
+            self.wins[states] = np.any(encoding.valid[states] & ~nextWins, axis=1)
+        # Actions of every state leading to a lost state for the other player
+        self.winning = encoding.valid & ~self.wins[np.maximum(encoding.next, 0)]
+
+    def state_wins(self, piles):
+        """
+        Returns True if the player to move in piles wins with perfect play.
+        """
+        return bool(self.wins[self.encoding.state(piles)])
+
+    def optimal_actions(self, piles):
+        """
+        Returns the set of optimal actions in piles.
+        """
+        encoding = self.encoding
+        state = encoding.state(piles)
+        good = self.winning[state] if self.wins[state] else encoding.valid[state]
+        return {encoding.actions[a] for a in np.flatnonzero(good)}
+
+    def check(self):
+        """
+        Returns the number of states where the solution
+        and nim_sum_wins disagree, which should be none.
+        """
+        return sum(self.wins[state] != nim_sum_wins(piles)
+                   for state, piles in enumerate(self.encoding.piles.tolist()))
+
+    def percent_optimal(self, ai):
+        """
+        Returns the percentage of the won states with objects left
+        where the greedy action of the NimAI ai is a winning one.
+        """
+        encoding = self.encoding
+        # The empty state is won but has no actions.
+        won = np.flatnonzero(self.wins[1:]) + 1
+        optimal = 0
+        for state in won:
+            action, _ = ai.best_q(encoding.state_piles(state))
+            optimal += bool(self.winning[state, encoding.action_index[action]])
+        return 100 * optimal / len(won) if len(won) else 100.0
+
+
+def train_until(target=100.0, interval=1000, games=100000, player=None,
+                solver=None, verbose=True):
+    """
+    Trains a NimAI like train, measuring percent_optimal every interval
+    games, until it reaches target or games games have been played.
+    Returns the AI and a list of (games, percent) measurements.
+    """
+    if player is None:
+        player = NimAI()
+    if solver is None:
+        solver = Solver()
+    history = []
+    played = 0
+    while played < games:
+        n = min(interval, games - played)
+        train(n, verbose=False, player=player, initial=list(solver.encoding.initial))
+        played += n
+        percent = solver.percent_optimal(player)
+        history.append((played, percent))
+        if verbose:
+            print(f"{played} games: {percent:.1f} % of won states played optimally")
+        if percent >= target:
+            break
+    return player, history
+
+
+def main():
+    argParser = argparse.ArgumentParser()
+    argParser.add_argument("--piles", type=int, nargs="+", default=[1, 3, 5, 7])
+    argParser.add_argument("--interval", type=int, default=1000,
+                           help="training games between measurements")
+    argParser.add_argument("--games", type=int, default=100000,
+                           help="most training games")
+    argParser.add_argument("--target", type=float, default=100.0,
+                           help="percent of won states with a winning action to stop at")
+    argParser.add_argument("--seed", type=int, default=None)
+    args = argParser.parse_args()
+
+    start = time.perf_counter()
+    solver = Solver(args.piles)
+    seconds = time.perf_counter() - start
+    print(f"Solved {solver.encoding.states} states in {1000 * seconds:.1f} ms, "
+          f"{np.count_nonzero(solver.wins)} won for the player to move, "
+          f"{solver.check()} differ from the nim-sum rule.")
+    print(f"The first player {'wins' if solver.state_wins(args.piles) else 'loses'} "
+          f"with perfect play.")
+
+    random.seed(args.seed)
+    start = time.perf_counter()
+    _, history = train_until(args.target, args.interval, args.games, solver=solver)
+    print(f"Trained {history[-1][0]} games in {time.perf_counter() - start:.2f} s.")
+
+
+if __name__ == "__main__":
+    main()
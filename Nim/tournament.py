@@ -0,0 +1,66 @@
+"""
+The Nim AI in the headless tournament of harness.py, at the top of the
+repository, without playing against a human. An AI is trained with
+--train games first, and the wins of the first and second player are
+reported.
+
+Usage: python harness.py nim [--train N] [--games N] [--workers N]
+                             [--seed S] [--output FILE]
+"""
+
+import random
+import time
+
+from nim import Nim, NimAI, train
+
+# AI of the worker process
+ai = None
+
+
+def start_worker(q):
+    global ai
+    ai = NimAI()
+    ai.q = q
+
+
+class Rules:
+    name = "nim"
+    outcomes = (("first_wins", "first_win_rate", 0),
+                ("second_wins", "second_win_rate", 1))
+
+    def initial_state(self):
+        return Nim()
+
+    def player(self, game):
+        return game.player
+
+    def actions(self, game):
+        return sorted(Nim.available_actions(game.piles))
+
+    def ai_action(self, game):
+        return ai.choose_action(game.piles, epsilon=False)
+
+    def result(self, game, action):
+        game.move(action)
+        return game
+
+    def over(self, game):
+        return game.winner is not None
+
+    def winner(self, game):
+        return game.winner
+
+
+def add_arguments(argParser):
+    argParser.add_argument("--train", type=int, default=10000,
+                           help="training games of the AI")
+
+
+def prepare(args, report):
+    random.seed(args.seed)
+    start = time.perf_counter()
+    player = train(args.train, verbose=False)
+    report["training_games"] = args.train
+    report["training_seconds"] = time.perf_counter() - start
+    report["q_values"] = len(player.q)
+    return start_worker, (player.q,)
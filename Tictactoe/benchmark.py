@@ -0,0 +1,223 @@
+"""
+Measures the tictactoe AI. Times the first move on an empty board
+with both search engines, the nested lists of tictactoe.py and the
+bitboards of bitboard.py, each with and without the transposition
+table, the bitboards also with symmetric positions sharing entries
+and with the opening book. Then plays a whole game of the AI against
+itself with the table kept between moves.
+
+With --mnk, runs the m,n,k-game engine of mnk.py on the empty boards
+of several sizes instead, with the time budget per move of --budget,
+and compares the nodes searched to --depth with and without move
+ordering. Adding --parallel N also compares the serial search with
+the root split search of parallel.py over N processes to --depth.
+
+With --check, checks instead that bitboard.minimax plays a move of the
+value of the position in every position reachable from the empty
+board, without the book, with and without the table.
+
+Usage: python benchmark.py [--table-size N] [--check]
+                           [--mnk [ROWSxCOLUMNSxK ...]] [--budget S] [--depth D]
+                           [--parallel N]
+"""
+
+import argparse
+import math
+import time
+
+import bitboard
+import mnk
+import parallel
+import tictactoe as ttt
+from transposition import TABLE_SIZE, TranspositionTable
+
+# Board sizes benchmarked with --mnk by default
+MNK_SIZES = ["3x3x3", "4x4x4", "5x5x4", "7x7x5", "15x15x5"]
+
+# Module holding the table, the search and whether symmetric
+# positions share entries for every engine
+ENGINES = {
+    "Lists": (ttt, lambda board: ttt.minimax_lists(board), False),
+    "Bitboard": (bitboard, lambda board: bitboard.minimax(*bitboard.from_board(board)), False),
+    "Symmetric": (bitboard, lambda board: bitboard.minimax(*bitboard.from_board(board)), True)
+}
+
+
+def first_move(engine, table):
+    """
+    Returns the first move, the time it took and the table statistics.
+    """
+    module, search, bitboard.symmetric = ENGINES[engine]
+    module.table = table
+    start = time.perf_counter()
+    move = search(ttt.initial_state())
+    return move, time.perf_counter() - start, table.stats()
+
+
+def self_play(table):
+    """
+    Plays the AI against itself and returns the time and table statistics
+    of every move.
+    """
+    bitboard.table = table
+    board = ttt.initial_state()
+    moves = []
+    while not ttt.terminal(board):
+        table.reset_stats()
+        start = time.perf_counter()
+        move = ttt.minimax(board)
+        moves.append((move, time.perf_counter() - start, table.stats()))
+        board = ttt.result(board, move)
+    return moves, ttt.winner(board)
+
+
+def report(name, seconds, stats):
+    print(f"{name}: {1000 * seconds:.1f} ms, {stats['nodes']} nodes, "
+          f"{stats['nodes'] / seconds:.0f} nodes/s, "
+          f"hit rate {100 * stats['hit_rate']:.1f}%, {stats['entries']} entries")
+
+
+def compare_mnk(sizes, budget, depth):
+    for size in sizes:
+        rows, columns, k = map(int, size.split("x"))
+        game = mnk.Game(rows, columns, k)
+        square, info = mnk.Searcher(game).best_move(0, 0, budget)
+        print(f"{rows}x{columns}, {k} in a row: played {game.action(square)} "
+              f"after depth {info['depth']}{' (solved)' if info['solved'] else ''}, "
+              f"value {info['value']}, {info['nodes']} nodes in {info['seconds']:.2f} s, "
+              f"{info['nodes_per_second']:.0f} nodes/s")
+
+        nodes = {}
+        for ordering in (False, True):
+            _, info = mnk.Searcher(game, ordering=ordering).best_move(0, 0, math.inf, depth)
+            nodes[ordering] = info["nodes"]
+        print(f"  To depth {info['depth']}: {nodes[False]} nodes unordered, "
+              f"{nodes[True]} ordered, {nodes[False] / nodes[True]:.1f}x fewer.")
+
+
+def solve(x, o, values):
+    """
+    Returns the value of the position for X by plain minimax without
+    pruning or the table, and adds it and every position after it to values.
+    """
+    key = x << 9 | o
+    if key not in values:
+        if bitboard.terminal(x, o):
+            values[key] = bitboard.utility(x, o)
+        else:
+            xToMove = bitboard.x_to_move(x, o)
+            results = [solve(x | move, o, values) if xToMove else solve(x, o | move, values)
+                       for move in bitboard.moves(x, o)]
+            values[key] = max(results) if xToMove else min(results)
+    return values[key]
+
+
+def check_minimax(tableSize):
+    values = {}
+    solve(0, 0, values)
+    book, table = bitboard.book, bitboard.table
+    bitboard.book = None
+    try:
+        for size in (0, tableSize):
+            bitboard.table = TranspositionTable(size)
+            for key, value in values.items():
+                x, o = key >> 9, key & bitboard.FULL
+                if bitboard.terminal(x, o):
+                    continue
+                move = 1 << bitboard.minimax(x, o)
+                after = (x | move, o) if bitboard.x_to_move(x, o) else (x, o | move)
+                if values[after[0] << 9 | after[1]] != value:
+                    raise Exception(f"minimax plays a worse move in {x:09b} {o:09b}")
+            print(f"{'With' if size else 'Without'} table: the moves of all "
+                  f"{len(values)} positions keep their value.")
+    finally:
+        bitboard.book, bitboard.table = book, table
+
+
+def compare_parallel(sizes, depth, workers):
+    for size in sizes:
+        rows, columns, k = map(int, size.split("x"))
+        game = mnk.Game(rows, columns, k)
+        serialMove, serial = mnk.Searcher(game).best_move(0, 0, math.inf, depth)
+        with parallel.ParallelSearcher(game, workers) as searcher:
+            parallelMove, split = searcher.best_move(0, 0, math.inf, depth)
+            processes = (f"{searcher.workers} processes" if searcher.executor is not None
+                         else "serial fallback")
+        if (serialMove, serial["value"]) != (parallelMove, split["value"]):
+            raise Exception(f"Parallel search disagrees on {size}")
+        print(f"{rows}x{columns}, {k} in a row, depth {serial['depth']}: "
+              f"played {game.action(serialMove)}, serial {serial['seconds']:.2f} s "
+              f"{serial['nodes']} nodes, {processes} {split['seconds']:.2f} s "
+              f"{split['nodes']} nodes, speedup {serial['seconds'] / split['seconds']:.2f}x")
+
+
+def main():
+    argParser = argparse.ArgumentParser()
+    argParser.add_argument("--table-size", type=int, default=TABLE_SIZE)
+    argParser.add_argument("--check", action="store_true",
+                           help="check the moves of bitboard.minimax in every position")
+    argParser.add_argument("--mnk", nargs="*", metavar="ROWSxCOLUMNSxK",
+                           help="benchmark the m,n,k-game engine on these boards")
+    argParser.add_argument("--budget", type=float, default=2.0,
+                           help="seconds per move with --mnk")
+    argParser.add_argument("--depth", type=int, default=4,
+                           help="depth of the comparisons with --mnk")
+    argParser.add_argument("--parallel", type=int, metavar="N",
+                           help="compare with the parallel search over N processes")
+    args = argParser.parse_args()
+
+    if args.check:
+        check_minimax(args.table_size)
+        return
+
+    if args.mnk is not None:
+        if args.parallel:
+            compare_parallel(args.mnk or MNK_SIZES, args.depth, args.parallel)
+        else:
+            compare_mnk(args.mnk or MNK_SIZES, args.budget, args.depth)
+        return
+
+    # Searches are timed without the book, which is timed last.
+    book = bitboard.book
+    bitboard.book = None
+
+    print("First move on an empty board")
+    results = {}
+    for engine in ENGINES:
+        for size in (0, args.table_size):
+            _, seconds, stats = first_move(engine, TranspositionTable(size))
+            results[engine, size] = (seconds, stats)
+            report(f"  {engine}, {'with' if size else 'without'} table", seconds, stats)
+    for size in (0, args.table_size):
+        (listTime, listStats), (bitTime, bitStats) = \
+            results["Lists", size], results["Bitboard", size]
+        print(f"  Bitboard {'with' if size else 'without'} table: "
+              f"{listTime / bitTime:.1f}x faster, "
+              f"{(bitStats['nodes'] / bitTime) / (listStats['nodes'] / listTime):.1f}x "
+              f"the nodes/s of lists.")
+    tableSpeedup = results["Lists", 0][0] / results["Lists", args.table_size][0]
+    print(f"  Table speedup with lists {tableSpeedup:.1f}x.")
+    symmetricStats = results["Symmetric", args.table_size][1]
+    print(f"  Symmetry: {symmetricStats['entries']} table entries instead of "
+          f"{results['Bitboard', args.table_size][1]['entries']}.")
+
+    if book is None:
+        print("  No opening book, run book.py to write it.")
+    else:
+        bitboard.book = book
+        rounds = 1000
+        start = time.perf_counter()
+        for _ in range(rounds):
+            bitboard.minimax(0, 0)
+        print(f"  From the opening book: "
+              f"{1000 * (time.perf_counter() - start) / rounds:.3f} ms.")
+
+    bitboard.book = None
+    moves, winner = self_play(TranspositionTable(args.table_size))
+    print(f"Self-play, winner {winner}")
+    for number, (move, seconds, stats) in enumerate(moves, start=1):
+        report(f"  Move {number} {move}", seconds, stats)
+
+
+if __name__ == "__main__":
+    main()
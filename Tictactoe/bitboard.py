@@ -0,0 +1,264 @@
+"""
+Tic Tac Toe search on bitboards.
+
+A position is two 9 bit integers, the squares of X and the squares of
+O, with square (i, j) at bit 3 * i + j. Moves are single bits, found
+by taking the lowest set bit of the empty squares, and a player has
+won if their mask covers any of the eight precomputed line masks.
+tictactoe.minimax converts the runner's nested lists to this form.
+
+Rotated and mirrored positions have the same value, so the search
+keys the transposition table by the smallest of the eight symmetric
+forms of a position. If book.py has written the opening book, the
+value of every reachable position is read from it instead.
+"""
+
+import math
+import os
+
+from transposition import TranspositionTable
+
+FULL = 0b111111111
+
+LINES = (
+    # Rows
+    0b000000111, 0b000111000, 0b111000000,
+    # Columns
+    0b001001001, 0b010010010, 0b100100100,
+    # Diagonals
+    0b100010001, 0b001010100
+)
+
+# WON[mask] tells whether the squares in mask contain a whole line.
+WON = tuple(any(mask & line == line for line in LINES) for mask in range(FULL + 1))
+
+# Square index of every single bit move
+SQUARE = {1 << square: square for square in range(9)}
+
+
+def symmetries():
+    """
+    Returns the eight symmetries of the board as lists
+    giving the square every square is moved to.
+    """
+    rotate = [3 * j + 2 - i for i in range(3) for j in range(3)]
+    mirror = [3 * i + 2 - j for i in range(3) for j in range(3)]
+    maps = []
+    current = list(range(9))
+    for _ in range(4):
+        maps.append(current)
+        maps.append([mirror[square] for square in current])
+        current = [rotate[square] for square in current]
+    return maps
+
+
+# TRANSFORMS[s][mask] is mask moved by symmetry s.
+TRANSFORMS = tuple(
+    tuple(sum(1 << squares[square] for square in range(9) if mask >> square & 1)
+          for mask in range(FULL + 1))
+    for squares in symmetries())
+
+# Search with symmetric positions sharing transposition table entries
+symmetric = True
+
+# TERNARY[mask] reads the squares of mask as base 3 digits of value 1,
+# so TERNARY[x] + 2 * TERNARY[o] numbers the positions from 0 to 3**9 - 1.
+TERNARY = tuple(sum(3 ** square for square in range(9) if mask >> square & 1)
+                for mask in range(FULL + 1))
+
+# Opening book, see book.py
+BOOK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+BOOK_MAGIC = b"TTTBOOK1"
+BOOK_SIZE = 3 ** 9
+
+
+def canonical(x, o):
+    """
+    Returns the smallest key x << 9 | o of the eight symmetric forms
+    of the position.
+    """
+    return min(t[x] << 9 | t[o] for t in TRANSFORMS)
+
+
+def book_index(x, o):
+    """
+    Returns the index of the position in the opening book.
+    """
+    key = canonical(x, o)
+    return TERNARY[key >> 9] + 2 * TERNARY[key & FULL]
+
+
+def load_book(filename=BOOK_FILE):
+    """
+    Returns the opening book written by book.py, None if there is none.
+    Byte i of the book is 0 for positions that are not in it and
+    the value of the position plus 2 for the others.
+    """
+    try:
+        with open(filename, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    if data[:len(BOOK_MAGIC)] != BOOK_MAGIC or len(data) != len(BOOK_MAGIC) + BOOK_SIZE:
+        raise ValueError(f"{filename} is not an opening book")
+    return data[len(BOOK_MAGIC):]
+
+
+def book_value(x, o):
+    """
+    Returns the value of the position from the book, None if it is not there.
+    """
+    if book is None:
+        return None
+    entry = book[book_index(x, o)]
+    return None if entry == 0 else entry - 2
+
+
+def from_board(board):
+    """
+    Returns the X and O masks of a board of nested lists.
+    """
+    x = o = 0
+    for i in range(3):
+        for j in range(3):
+            if board[i][j] == "X":
+                x |= 1 << (3 * i + j)
+            elif board[i][j] == "O":
+                o |= 1 << (3 * i + j)
+    return x, o
+
+
+def to_board(x, o):
+    """
+    Returns the board of nested lists for the X and O masks.
+    """
+    return [["X" if x >> (3 * i + j) & 1 else "O" if o >> (3 * i + j) & 1 else None
+             for j in range(3)] for i in range(3)]
+
+
+def moves(x, o):
+    """
+    Yields the empty squares as single bits, lowest first.
+    """
+    empty = FULL & ~(x | o)
+    while empty:
+        move = empty & -empty
+        empty ^= move
+        yield move
+
+
+def x_to_move(x, o):
+    return bin(x).count("1") == bin(o).count("1")
+
+
+def winner(x, o):
+    """
+    Returns "X" or "O" if that player has a line, None otherwise.
+    """
+    if WON[x]: return "X"
+    if WON[o]: return "O"
+    return None
+
+
+def terminal(x, o):
+    return WON[x] or WON[o] or (x | o) == FULL
+
+
+def utility(x, o):
+    if WON[x]: return 1
+    if WON[o]: return -1
+    return 0
+
+
+class SearchCancelled(Exception):
+    """Raised by minimax when its cancel event is set."""
+    pass
+
+
+def minimax(x, o, cancel=None):
+    """
+    Returns the square index of the optimal move for the player to move,
+    None if the game is over. If the threading.Event cancel is set, the
+    search stops before the next move at the root with SearchCancelled.
+    """
+    if terminal(x, o): return None
+
+    bestMove = None
+    if x_to_move(x, o):
+        value = -math.inf
+        for move in moves(x, o):
+            if cancel is not None and cancel.is_set(): raise SearchCancelled
+            moveVal = book_value(x | move, o)
+            if moveVal is None:
+                # Moves that cannot beat the best so far are cut off.
+                moveVal = minVal(x | move, o, value, math.inf)
+            if moveVal > value:
+                bestMove = move
+                value = moveVal
+    else:
+        value = math.inf
+        for move in moves(x, o):
+            if cancel is not None and cancel.is_set(): raise SearchCancelled
+            moveVal = book_value(x, o | move)
+            if moveVal is None:
+                moveVal = maxVal(x, o | move, -math.inf, value)
+            if moveVal < value:
+                bestMove = move
+                value = moveVal
+    return SQUARE[bestMove]
+
+
+def maxVal(x, o, alpha, beta):
+    """
+    Value of a position with X to move. Only O can have won in it.
+    """
+    table.nodes += 1
+    if WON[o]: return -1
+    if (x | o) == FULL: return 0
+
+    key = canonical(x, o) if symmetric else x << 9 | o
+    cached = table.lookup(key, alpha, beta)
+    if cached is not None: return cached
+
+    window = (alpha, beta)
+    v = -math.inf
+    empty = FULL & ~(x | o)
+    while empty:
+        move = empty & -empty
+        empty ^= move
+        v = max(v, minVal(x | move, o, alpha, beta))
+        if v >= beta: break
+        alpha = max(alpha, v)
+    table.store(key, v, *window)
+    return v
+
+
+def minVal(x, o, alpha, beta):
+    """
+    Value of a position with O to move. Only X can have won in it.
+    """
+    table.nodes += 1
+    if WON[x]: return 1
+    if (x | o) == FULL: return 0
+
+    key = canonical(x, o) if symmetric else x << 9 | o
+    cached = table.lookup(key, alpha, beta)
+    if cached is not None: return cached
+
+    window = (alpha, beta)
+    v = math.inf
+    empty = FULL & ~(x | o)
+    while empty:
+        move = empty & -empty
+        empty ^= move
+        v = min(v, maxVal(x, o | move, alpha, beta))
+        if v <= alpha: break
+        beta = min(beta, v)
+    table.store(key, v, *window)
+    return v
+
+
+# Shared by every search, so it persists across the moves of a game.
+table = TranspositionTable()
+
+book = load_book()
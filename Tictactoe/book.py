@@ -0,0 +1,71 @@
+"""
+Writes the opening book of tictactoe, the value of every position
+that can be reached from the empty board.
+
+Positions are solved once per symmetry class and stored at the book
+index of their smallest symmetric form, one byte per position, so that
+bitboard.minimax reads the value of any position with a single lookup.
+
+Usage: python book.py [--output FILE]
+"""
+
+import argparse
+import math
+import time
+
+import bitboard
+
+
+def reachable():
+    """
+    Returns the canonical keys of every position reachable from the empty board.
+    """
+    seen = set()
+    stack = [(0, 0)]
+    while stack:
+        x, o = stack.pop()
+        key = bitboard.canonical(x, o)
+        if key in seen:
+            continue
+        seen.add(key)
+        if bitboard.terminal(x, o):
+            continue
+        xToMove = bitboard.x_to_move(x, o)
+        for move in bitboard.moves(x, o):
+            stack.append((x | move, o) if xToMove else (x, o | move))
+    return seen
+
+
+def build_book():
+    """
+    Returns the book as bytes and the number of positions in it.
+    """
+    book = bytearray(bitboard.BOOK_SIZE)
+    keys = reachable()
+    for key in keys:
+        x, o = key >> 9, key & bitboard.FULL
+        if bitboard.terminal(x, o):
+            value = bitboard.utility(x, o)
+        elif bitboard.x_to_move(x, o):
+            value = bitboard.maxVal(x, o, -math.inf, math.inf)
+        else:
+            value = bitboard.minVal(x, o, -math.inf, math.inf)
+        book[bitboard.book_index(x, o)] = value + 2
+    return bytes(book), len(keys)
+
+
+def main():
+    argParser = argparse.ArgumentParser()
+    argParser.add_argument("--output", default=bitboard.BOOK_FILE)
+    args = argParser.parse_args()
+
+    start = time.perf_counter()
+    book, positions = build_book()
+    with open(args.output, "wb") as f:
+        f.write(bitboard.BOOK_MAGIC + book)
+    print(f"Solved {positions} positions in {time.perf_counter() - start:.2f} s, "
+          f"wrote {len(bitboard.BOOK_MAGIC) + len(book)} bytes to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+"""
+Engine for m,n,k-games, tictactoe on a board of any number of rows
+and columns won by k marks in a row.
+
+Positions are bitboards like in bitboard.py, with square (i, j) at bit
+i * columns + j of Python integers of any length. Every line of k
+squares is precomputed as a mask, and a move wins if it completes one
+of the lines through its square.
+
+Searching to the end of the game is only possible on small boards, so
+Searcher.best_move deepens the search one ply at a time until the time
+budget runs out and plays the move of the deepest finished search.
+Positions at the depth limit are scored by how many lines each player
+could still complete and how far along they are. Moves are searched
+best first: the move the transposition table remembers, then the
+killer moves that caused a cutoff at the same ply elsewhere in the
+tree, then by a history score of how often each square caused cutoffs.
+"""
+
+import math
+import time
+
+from transposition import TABLE_SIZE, TranspositionTable
+
+# Value of a won game for the winner. Wins sooner are worth more by one per ply.
+WIN = 1000000
+
+# Values beyond this are won or lost games rather than evaluations.
+MATE = WIN // 2
+
+# Nodes searched between looks at the clock
+CLOCK_INTERVAL = 1024
+
+# On boards with more squares than this only squares next to
+# the marks already played are considered as moves.
+NEAR_SQUARES = 25
+
+
+def to_table(value, ply):
+    """
+    Returns value found ply plies from the root as it is stored in the
+    transposition table, with wins and losses counted from the position
+    instead of from the root, so that they hold at any ply.
+    """
+    if value > MATE: return value + ply
+    if value < -MATE: return value - ply
+    return value
+
+
+def from_table(value, ply):
+    """
+    Returns value stored in the transposition table as seen from ply plies.
+    """
+    if value > MATE: return value - ply
+    if value < -MATE: return value + ply
+    return value
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time budget is used up."""
+    pass
+
+
+class Game:
+    """
+    Rules of the m,n,k-game with rows x columns squares and k in a row to win.
+    """
+
+    def __init__(self, rows, columns, k):
+        if not 1 <= k <= max(rows, columns):
+            raise ValueError(f"{k} in a row does not fit on a {rows}x{columns} board")
+        self.rows = rows
+        self.columns = columns
+        self.k = k
+        self.squares = rows * columns
+        self.full = (1 << self.squares) - 1
+
+        self.lines = []
+        for i in range(rows):
+            for j in range(columns):
+                for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    if 0 <= i + (k - 1) * di < rows and 0 <= j + (k - 1) * dj < columns:
+                        self.lines.append(sum(1 << ((i + t * di) * columns + j + t * dj)
+                                              for t in range(k)))
+        self.square_lines = [[line for line in self.lines if line >> square & 1]
+                             for square in range(self.squares)]
+
+        # Masks of every square but those in the first and the last column
+        firstColumn = sum(1 << (i * columns) for i in range(rows))
+        self.not_first = self.full & ~firstColumn
+        self.not_last = self.full & ~(firstColumn << (columns - 1))
+
+        # Squares closer to the centre are tried first when nothing else tells moves apart.
+        self.centrality = [-abs(i - (rows - 1) / 2) - abs(j - (columns - 1) / 2)
+                           for i in range(rows) for j in range(columns)]
+        # Of root moves with the same value the one of lowest rank is played,
+        # the most central one and then the lowest square.
+        self.rank = [0] * self.squares
+        for rank, square in enumerate(sorted(range(self.squares),
+                                             key=lambda s: (-self.centrality[s], s))):
+            self.rank[square] = rank
+
+        # Score of a line holding count marks of one player only
+        self.weights = [0] + [4 ** (count - 1) for count in range(1, k + 1)]
+
+    def from_board(self, board):
+        """
+        Returns the X and O masks of a board of nested lists.
+        """
+        x = o = 0
+        for i in range(self.rows):
+            for j in range(self.columns):
+                if board[i][j] == "X":
+                    x |= 1 << (i * self.columns + j)
+                elif board[i][j] == "O":
+                    o |= 1 << (i * self.columns + j)
+        return x, o
+
+    def to_board(self, x, o):
+        """
+        Returns the board of nested lists for the X and O masks.
+        """
+        return [["X" if x >> (i * self.columns + j) & 1 else
+                 "O" if o >> (i * self.columns + j) & 1 else None
+                 for j in range(self.columns)] for i in range(self.rows)]
+
+    def action(self, square):
+        """
+        Returns the (i, j) action of square.
+        """
+        return divmod(square, self.columns)
+
+    def completes_line(self, mask, square):
+        """
+        Returns True if mask holds a whole line through square.
+        """
+        for line in self.square_lines[square]:
+            if mask & line == line:
+                return True
+        return False
+
+    def winner(self, x, o):
+        for line in self.lines:
+            if x & line == line: return "X"
+            if o & line == line: return "O"
+        return None
+
+    def terminal(self, x, o):
+        return self.winner(x, o) is not None or (x | o) == self.full
+
+    def near(self, mask):
+        """
+        Returns mask grown by one square in every direction.
+        """
+        grown = mask | (mask << 1 & self.not_first) | (mask >> 1 & self.not_last)
+        return (grown | grown << self.columns | grown >> self.columns) & self.full
+
+    def evaluate(self, own, other):
+        """
+        Heuristic value of a position for the player owning own.
+        """
+        weights = self.weights
+        score = 0
+        for line in self.lines:
+            mine = own & line
+            theirs = other & line
+            if mine and not theirs:
+                score += weights[mine.bit_count()]
+            elif theirs and not mine:
+                score -= weights[theirs.bit_count()]
+        return score
+
+
+class Searcher:
+    """
+    Iterative deepening alpha-beta search for one Game. The transposition
+    table and the history scores are kept between moves.
+    """
+
+    def __init__(self, game, tableSize=TABLE_SIZE, ordering=True):
+        self.game = game
+        self.table = TranspositionTable(tableSize)
+        self.ordering = ordering
+        self.history = [0] * game.squares
+        self.killers = []
+        self.deadline = math.inf
+
+    def best_move(self, x, o, budget=1.0, maxDepth=None):
+        """
+        Returns the square of the best move for the player to move found
+        in budget seconds, or None if the game is over, and a dictionary
+        with the depth reached, the value, nodes searched and time taken.
+        """
+        game = self.game
+        if game.terminal(x, o):
+            return None, {}
+        start = time.perf_counter()
+        self.deadline = start + budget
+        self.table.reset_stats()
+        own, other = (x, o) if x.bit_count() == o.bit_count() else (o, x)
+        remaining = (game.full & ~(x | o)).bit_count()
+        maxDepth = remaining if maxDepth is None else min(maxDepth, remaining)
+        self.killers = [[None, None] for _ in range(remaining + 1)]
+        # With moves left out by NEAR_SQUARES a win or loss may be undone by
+        # a move never tried, here or in a position taken from the table.
+        exact = game.squares <= NEAR_SQUARES
+        # Older history says less about the new position.
+        self.history = [score // 2 for score in self.history]
+
+        bestMove = None
+        value = 0
+        depth = 0
+        while depth < maxDepth:
+            try:
+                value, bestMove = self.root(own, other, depth + 1)
+            except SearchTimeout:
+                break
+            depth += 1
+            # A forced win or loss does not change with more depth.
+            if exact and abs(value) > MATE:
+                break
+        if bestMove is None:
+            bestMove = self.order(own, other, 0, None)[0]
+
+        seconds = time.perf_counter() - start
+        return bestMove, {"depth": depth, "value": value, "nodes": self.table.nodes,
+                          "seconds": seconds, "nodes_per_second": self.table.nodes / seconds,
+                          "solved": exact and (depth == remaining or abs(value) > MATE)}
+
+    def best_action(self, board, budget=1.0, maxDepth=None):
+        """
+        Returns the best (i, j) action on a board of nested lists, None if
+        the game is over.
+        """
+        square, _ = self.best_move(*self.game.from_board(board), budget, maxDepth)
+        return None if square is None else self.game.action(square)
+
+    def root(self, own, other, depth):
+        """
+        Returns the value and the best square of the position to depth.
+        Of moves with the same value the one of lowest Game.rank is
+        played, so that the move does not depend on the search order.
+        """
+        rank = self.game.rank
+        key = own << self.game.squares | other
+        alpha = -math.inf
+        bestMove = None
+        for square in self.order(own, other, 0, key):
+            # A move ranked before the best so far is also searched for a tie.
+            bound = alpha - 1 if bestMove is not None and rank[square] < rank[bestMove] else alpha
+            value = -self.negamax(other, own | 1 << square, depth - 1, 1,
+                                  -math.inf, -bound, square)
+            if value > bound:
+                alpha = value
+                bestMove = square
+        self.table.store(key, alpha, -math.inf, math.inf, depth, bestMove)
+        return alpha, bestMove
+
+    def negamax(self, own, other, depth, ply, alpha, beta, last):
+        """
+        Returns the value of the position for the player owning own,
+        after the other player played square last, searched to depth.
+        """
+        table = self.table
+        table.nodes += 1
+        if table.nodes % CLOCK_INTERVAL == 0 and time.perf_counter() > self.deadline:
+            raise SearchTimeout
+        game = self.game
+        if game.completes_line(other, last): return ply - WIN
+        if (own | other) == game.full: return 0
+        if depth == 0: return game.evaluate(own, other)
+
+        key = own << game.squares | other
+        cached = table.lookup(key, to_table(alpha, ply), to_table(beta, ply), depth)
+        if cached is not None: return from_table(cached, ply)
+
+        window = (alpha, beta)
+        v = -math.inf
+        bestMove = None
+        for square in self.order(own, other, ply, key):
+            value = -self.negamax(other, own | 1 << square, depth - 1, ply + 1,
+                                  -beta, -alpha, square)
+            if value > v:
+                v = value
+                bestMove = square
+            if v >= beta:
+                self.cutoff(square, ply, depth)
+                break
+            alpha = max(alpha, v)
+        table.store(key, to_table(v, ply), to_table(window[0], ply),
+                    to_table(window[1], ply), depth, bestMove)
+        return v
+
+    def order(self, own, other, ply, key):
+        """
+        Returns the squares to try in the position, best first.
+        """
+        game = self.game
+        occupied = own | other
+        empty = game.full & ~occupied
+        if occupied and game.squares > NEAR_SQUARES:
+            empty &= game.near(occupied)
+        squares = []
+        while empty:
+            move = empty & -empty
+            empty ^= move
+            squares.append(move.bit_length() - 1)
+        if not self.ordering:
+            return squares
+
+        first = self.table.best_move(key)
+        killers = self.killers[ply]
+        history = self.history
+        centrality = game.centrality
+        squares.sort(key=lambda square: (square == first, square in killers,
+                                         history[square], centrality[square]),
+                     reverse=True)
+        return squares
+
+    def cutoff(self, square, ply, depth):
+        """
+        Remember square as a killer at ply and add to its history score.
+        """
+        killers = self.killers[ply]
+        if killers[0] != square:
+            killers[1] = killers[0]
+            killers[0] = square
+        self.history[square] += depth * depth
@@ -0,0 +1,178 @@
+"""
+Parallel root split search for the m,n,k-game engine of mnk.py.
+
+The first move at the root, the eldest brother, is searched in this
+process to get a bound on the value of the position. Only then, as in
+young brothers wait, the other root moves are searched at the same time
+in a process pool. The best value found so far is shared between the
+workers, and every root move is searched with it as the lower bound,
+so moves that cannot beat it are cut off early. A worker reads the
+bound again before every reply to its root move, so a better move
+found by another worker meanwhile narrows the rest of its search.
+
+On a single core the processes would only take turns, so there and
+for root depths below PARALLEL_DEPTH, where a root move is too little
+work to pay for sending it to a worker, the serial search is used.
+
+The move chosen is the same as the one of Searcher for the same depth,
+the move of lowest Game.rank with the best value, whichever order the
+workers finish in. A move ranked before the best so far is searched
+with a bound one below the best value, so that a tie is found exactly.
+"""
+
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from mnk import Game, Searcher, SearchTimeout, to_table
+from transposition import TABLE_SIZE
+
+# Root depths searched in the pool, shallower ones are searched serially
+PARALLEL_DEPTH = 4
+
+# Searcher and shared best value and square of the worker process
+worker = None
+shared = None
+
+
+def start_worker(rows, columns, k, tableSize, bestValue, bestSquare):
+    global worker, shared
+    worker = Searcher(Game(rows, columns, k), tableSize)
+    shared = (bestValue, bestSquare)
+
+
+def shared_bound(square):
+    """
+    Returns the lower bound the root move to square has to beat now.
+    """
+    bestValue, bestSquare = shared
+    rank = worker.game.rank
+    with bestValue.get_lock():
+        alpha = bestValue.value
+        if rank[square] < rank[bestSquare.value]:
+            alpha -= 1
+    return alpha
+
+
+def search_move(own, other, square, depth, budget):
+    """
+    Searches the root move to square to depth within budget seconds.
+    Returns square, the value or None if the time ran out, the lower
+    bound it was last searched with and the number of nodes searched.
+    Runs in the worker processes.
+    """
+    game = worker.game
+    worker.deadline = time.perf_counter() + budget
+    worker.killers = [[None, None] for _ in range(depth + 1)]
+    nodes = worker.table.nodes
+    own |= 1 << square
+    try:
+        if depth == 1 or game.completes_line(own, square) or (own | other) == game.full:
+            alpha = shared_bound(square)
+            value = -worker.negamax(other, own, depth - 1, 1, -math.inf, -alpha, square)
+        else:
+            # The replies are searched here rather than in negamax, so that
+            # the bound can be read again before each of them. The bound
+            # only grows, so values found with an earlier one still hold.
+            key = other << game.squares | own
+            v = -math.inf
+            bestReply = None
+            for reply in worker.order(other, own, 1, key):
+                alpha = shared_bound(square)
+                if v >= -alpha:
+                    break
+                replyValue = -worker.negamax(own, other | 1 << reply, depth - 2, 2,
+                                             alpha, -v, reply)
+                if replyValue > v:
+                    v = replyValue
+                    bestReply = reply
+                if v >= -alpha:
+                    worker.cutoff(reply, 1, depth - 1)
+                    break
+            worker.table.store(key, to_table(v, 1), -math.inf, to_table(-alpha, 1),
+                               depth - 1, bestReply)
+            value = -v
+    except SearchTimeout:
+        return square, None, alpha, worker.table.nodes - nodes
+
+    bestValue, bestSquare = shared
+    with bestValue.get_lock():
+        if value > bestValue.value or (value == bestValue.value and
+                                       worker.game.rank[square] < worker.game.rank[bestSquare.value]):
+            bestValue.value = value
+            bestSquare.value = square
+    return square, value, alpha, worker.table.nodes - nodes
+
+
+class ParallelSearcher(Searcher):
+    """
+    Searcher that splits the root moves over a process pool.
+    Close it, or use it in a with statement, to stop the workers.
+    Without a second core or worker it searches like Searcher.
+    """
+
+    def __init__(self, game, workers=None, tableSize=TABLE_SIZE):
+        super().__init__(game, tableSize)
+        cores = os.cpu_count() or 1
+        self.workers = workers or cores
+        self.executor = None
+        if cores == 1 or self.workers == 1:
+            self.workers = 1
+            return
+        self.bestValue = multiprocessing.Value("d", -math.inf)
+        self.bestSquare = multiprocessing.Value("i", 0)
+        self.executor = ProcessPoolExecutor(
+            self.workers, initializer=start_worker,
+            initargs=(game.rows, game.columns, game.k, tableSize,
+                      self.bestValue, self.bestSquare))
+        # Start the workers now so that their start up is not timed with a move.
+        for future in [self.executor.submit(os.getpid) for _ in range(self.workers)]:
+            future.result()
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def root(self, own, other, depth):
+        if self.executor is None or depth < PARALLEL_DEPTH:
+            return super().root(own, other, depth)
+        key = own << self.game.squares | other
+        squares = self.order(own, other, 0, key)
+        value = -self.negamax(other, own | 1 << squares[0], depth - 1, 1,
+                              -math.inf, math.inf, squares[0])
+        with self.bestValue.get_lock():
+            self.bestValue.value = value
+            self.bestSquare.value = squares[0]
+
+        budget = self.deadline - time.perf_counter()
+        futures = [self.executor.submit(search_move, own, other, square, depth, budget)
+                   for square in squares[1:]]
+        rank = self.game.rank
+        bestValue, bestMove = value, squares[0]
+        timedOut = False
+        for future in futures:
+            if future.cancelled():
+                continue
+            square, value, alpha, nodes = future.result()
+            self.table.nodes += nodes
+            if value is None:
+                timedOut = True
+                for pending in futures:
+                    pending.cancel()
+            elif value > alpha and (value > bestValue or
+                                    (value == bestValue and rank[square] < rank[bestMove])):
+                # Only values above the bound are exact.
+                bestValue, bestMove = value, square
+        if timedOut:
+            raise SearchTimeout
+
+        self.table.store(key, bestValue, -math.inf, math.inf, depth, bestMove)
+        return bestValue, bestMove
@@ -1,9 +1,19 @@
 import pygame
+import statistics
 import sys
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 import tictactoe as ttt
 
+# Shortest time the computer is shown thinking, in seconds
+AI_DELAY = 0.5
+
+# Number of latest frame times kept for the statistics
+FRAME_WINDOW = 1000
+
 pygame.init()
 size = width, height = 600, 400
 
@@ -19,12 +29,34 @@ moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
 
 user = None
 board = ttt.initial_state()
-ai_turn = False
+
+# The AI searches in a background thread so that the window keeps
+# drawing and handling events in the meantime. Setting cancel stops
+# the running search before its next move at the root.
+executor = ThreadPoolExecutor(1)
+search = None
+cancel = None
+searchStart = None
+frameTimes = deque(maxlen=FRAME_WINDOW)
+frameStart = time.perf_counter()
+
+
+def print_frame_times():
+    if len(frameTimes) >= 2:
+        cuts = statistics.quantiles(frameTimes, n=100, method="inclusive")
+        print(f"Frame time over the last {len(frameTimes)} frames: "
+              f"median {1000 * cuts[49]:.1f} ms, p99 {1000 * cuts[98]:.1f} ms, "
+              f"max {1000 * max(frameTimes):.1f} ms")
+
 
 while True:
 
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
+            print_frame_times()
+            if cancel is not None:
+                cancel.set()
+            executor.shutdown(wait=False, cancel_futures=True)
             sys.exit()
 
     screen.fill(black)
@@ -102,21 +134,22 @@ while True:
         elif user == player:
             title = f"Play as {user}"
         else:
-            title = f"Computer thinking..."
+            dots = int(2 * time.perf_counter()) % 3 + 1
+            title = f"Computer thinking{'.' * dots}"
         title = largeFont.render(title, True, white)
         titleRect = title.get_rect()
         titleRect.center = ((width / 2), 30)
         screen.blit(title, titleRect)
 
-        # Check for AI move
+        # Check for AI move, start a search or play the move once it is done
         if user != player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
-                board = ttt.result(board, move)
-                ai_turn = False
-            else:
-                ai_turn = True
+            if search is None:
+                cancel = threading.Event()
+                search = executor.submit(ttt.minimax, board, cancel)
+                searchStart = time.perf_counter()
+            elif search.done() and time.perf_counter() - searchStart >= AI_DELAY:
+                board = ttt.result(board, search.result())
+                search = None
 
         # Check for a user move
         click, _, _ = pygame.mouse.get_pressed()
@@ -127,7 +160,8 @@ while True:
                     if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse)):
                         board = ttt.result(board, (i, j))
 
-        if game_over:
+        # Play Again is also shown while the computer thinks, to cancel the search.
+        if game_over or search is not None:
             againButton = pygame.Rect(width / 3, height - 65, width / 3, 50)
             again = mediumFont.render("Play Again", True, black)
             againRect = again.get_rect()
@@ -139,8 +173,17 @@ while True:
                 mouse = pygame.mouse.get_pos()
                 if againButton.collidepoint(mouse):
                     time.sleep(0.2)
+                    if search is not None:
+                        # A search that already started stops at its next
+                        # move at the root, before the new game's search.
+                        cancel.set()
+                        search.cancel()
+                        search = None
                     user = None
                     board = ttt.initial_state()
-                    ai_turn = False
 
     pygame.display.flip()
+
+    now = time.perf_counter()
+    frameTimes.append(now - frameStart)
+    frameStart = now
@@ -6,6 +6,9 @@ import math
 import copy
 from pydoc import TextDoc
 
+import bitboard
+from transposition import TranspositionTable
+
 X = "X"
 O = "O"
 EMPTY = None
@@ -99,9 +102,20 @@ def utility(board):
     #         return 0
 
 
-def minimax(board):
+def minimax(board, cancel=None):
     """
     Returns the optimal action for the current player on the board.
+    The search runs on the bitboards of bitboard.py, and stops with
+    bitboard.SearchCancelled once the threading.Event cancel is set.
+    """
+    square = bitboard.minimax(*bitboard.from_board(board), cancel)
+    if square is None: return None
+    return divmod(square, 3)
+
+def minimax_lists(board):
+    """
+    Returns the optimal action like minimax, searching on the nested
+    lists. Kept to compare the engines against.
     """
     if terminal(board): return None
 
@@ -128,25 +142,39 @@ def minimax(board):
     return bestAction
 
 def maxVal(board, alpha, beta):
+    table.nodes += 1
     if terminal(board): return utility(board)
 
+    key = boardKey(board)
+    cached = table.lookup(key, alpha, beta)
+    if cached is not None: return cached
+
+    window = (alpha, beta)
     v = -math.inf
     for action in actions(board):
         actionVal = minVal(result(board, action), alpha, beta)
         v = max(v, actionVal)
-        if v >= beta: return v
+        if v >= beta: break
         alpha = max(alpha, v)
+    table.store(key, v, *window)
     return v
 
 def minVal(board, alpha, beta):
+    table.nodes += 1
     if terminal(board): return utility(board)
 
+    key = boardKey(board)
+    cached = table.lookup(key, alpha, beta)
+    if cached is not None: return cached
+
+    window = (alpha, beta)
     v = math.inf
     for action in actions(board):
         actionVal = maxVal(result(board,action), alpha, beta)
         v = min(v, actionVal)
-        if v <= alpha: return v
+        if v <= alpha: break
         beta = min(beta, v)
+    table.store(key, v, *window)
     return v
 
 def flatten(nested, oneD = None):
@@ -181,6 +209,16 @@ def playerWon(board, player):
         return True
     return False
 
+def boardKey(board):
+    """
+    Returns an integer that is the same for equal boards only,
+    reading the squares as base 3 digits.
+    """
+    key = 0
+    for square in flatten(board):
+        key = 3 * key + (1 if square == X else 2 if square == O else 0)
+    return key
+
 def transpose(board):
     """
     Return a copy of the board, rows and columns swapped.
@@ -192,6 +230,9 @@ def transpose(board):
     return tBoard
 
 
+# Shared by every search, so it persists across the moves of a game.
+table = TranspositionTable()
+
 
 class IllegalMoveError(Exception):
     """Raised when attempting an illegal move."""
@@ -0,0 +1,47 @@
+"""
+The tictactoe AI in the headless tournament of harness.py, at the top
+of the repository, without the pygame runner. The wins of X and O and
+the draws are reported, and whether the opening book was used.
+
+Usage: python harness.py tictactoe [--games N] [--workers N] [--seed S]
+                                   [--output FILE]
+"""
+
+import tictactoe as ttt
+
+
+class Rules:
+    name = "tictactoe"
+    outcomes = (("x_wins", "x_win_rate", ttt.X),
+                ("o_wins", "o_win_rate", ttt.O),
+                ("draws", "draw_rate", None))
+
+    def initial_state(self):
+        return ttt.initial_state()
+
+    def player(self, board):
+        return 0 if ttt.player(board) == ttt.X else 1
+
+    def actions(self, board):
+        return sorted(ttt.actions(board))
+
+    def ai_action(self, board):
+        return ttt.minimax(board)
+
+    def result(self, board, action):
+        return ttt.result(board, action)
+
+    def over(self, board):
+        return ttt.terminal(board)
+
+    def winner(self, board):
+        return ttt.winner(board)
+
+
+def add_arguments(argParser):
+    pass
+
+
+def prepare(args, report):
+    report["opening_book"] = ttt.bitboard.book is not None
+    return None, ()
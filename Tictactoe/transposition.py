@@ -0,0 +1,102 @@
+"""
+Transposition table shared by the tictactoe search engines.
+"""
+
+import math
+from collections import OrderedDict
+
+# Maximum number of positions kept in the transposition table
+TABLE_SIZE = 100000
+
+# Kinds of values in the transposition table. A search that fails high
+# or low only gives a bound of the real value of the position.
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+
+class TranspositionTable:
+    """
+    Values of positions already searched, kept between moves so that
+    positions reached through another move order or searched for an
+    earlier move are not searched again.
+
+    A value found within the search window is exact. A value that
+    caused a cutoff is only a lower (for max) or upper (for min) bound,
+    which answers a later lookup only if it causes the same cutoff.
+    Depth limited searches also store the depth searched, and the
+    value only answers lookups that need at most that depth. Values
+    stored without a depth are from a search to the end of the game.
+    When full, the least recently used position is dropped.
+    """
+
+    def __init__(self, maxSize=TABLE_SIZE):
+        self.maxSize = maxSize
+        self.entries = OrderedDict()
+        self.nodes = 0
+        self.probes = 0
+        self.hits = 0
+        self.evictions = 0
+
+    def lookup(self, key, alpha, beta, depth=0):
+        """
+        Returns the value of position key if the table settles it
+        for the window alpha, beta and depth, None otherwise.
+        """
+        self.probes += 1
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        value, kind, entryDepth, _ = entry
+        if entryDepth < depth:
+            return None
+        if kind == EXACT or (kind == LOWER and value >= beta) or \
+                (kind == UPPER and value <= alpha):
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+        return None
+
+    def best_move(self, key):
+        """
+        Returns the best move stored for position key, if any.
+        """
+        entry = self.entries.get(key)
+        return None if entry is None else entry[3]
+
+    def store(self, key, value, alpha, beta, depth=math.inf, move=None):
+        """
+        Store value of position key, searched with the window alpha, beta
+        to depth, and optionally the move that gave the value.
+        """
+        if self.maxSize <= 0:
+            return
+        if value <= alpha:
+            kind = UPPER
+        elif value >= beta:
+            kind = LOWER
+        else:
+            kind = EXACT
+        self.entries[key] = (value, kind, depth, move)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxSize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def reset_stats(self):
+        self.nodes = 0
+        self.probes = 0
+        self.hits = 0
+        self.evictions = 0
+
+    def stats(self):
+        """
+        Returns the counters since the last reset_stats as a dictionary.
+        """
+        return {"nodes": self.nodes, "probes": self.probes, "hits": self.hits,
+                "hit_rate": self.hits / self.probes if self.probes else 0.0,
+                "entries": len(self.entries), "evictions": self.evictions}
+
+    def clear(self):
+        self.entries.clear()
+        self.reset_stats()
@@ -0,0 +1,216 @@
+"""
+Headless tournaments of the game AIs of the folders in GAMES.
+
+Every match up, the AI against itself and the AI against a player
+making random moves on both sides, is played for a number of games
+spread over a process pool. Every game is seeded, so runs can be
+repeated. The AIs always play the same move in the same position, so
+in games of the AI against itself the first OPENING moves are random,
+or every game would be the same one. The wins, moves per second and
+latency percentiles of the AI moves of every match up are reported as
+JSON, along with the commit of the code, so that results of versions
+can be compared.
+
+This is the one place that puts a game folder on sys.path, and imports
+the tournament.py of the game from there. That module has:
+
+    Rules, a class with the name of the game, the outcomes reported,
+        each as the key of its count, the key of its rate and the
+        winner, and the methods initial_state(), player(state) giving
+        0 for the player moving first and 1 for the other, actions(state)
+        in a fixed order, ai_action(state), result(state, action),
+        over(state) and winner(state)
+    add_arguments(argParser), adding the arguments of the game
+    prepare(args, report), adding to the report whatever the game
+        needs and returning the initializer of the workers and its
+        arguments
+
+Usage: python harness.py {tictactoe,nim} [--games N] [--workers N]
+                         [--seed S] [--output FILE] [game arguments]
+"""
+
+import argparse
+import importlib
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Folder of every game, next to this file
+GAMES = {
+    "tictactoe": "Tictactoe",
+    "nim": "Nim"
+}
+
+# Players of the first and the second player in every match up
+MATCHES = {
+    "ai-vs-ai": ("ai", "ai"),
+    "ai-vs-random": ("ai", "random"),
+    "random-vs-ai": ("random", "ai")
+}
+
+# Games given to a worker at a time
+CHUNK = 100
+
+# Random moves opening every game of the AI against itself
+OPENING = 2
+
+
+def play_games(rules, match, seeds):
+    """
+    Plays a game of match for every seed, which seeds the random moves.
+    Returns the winner, the number of moves, the time taken and the
+    latencies of the AI moves of every game. Runs in the worker processes.
+    """
+    players = MATCHES[match]
+    opening = OPENING if players == ("ai", "ai") else 0
+    games = []
+    for seed in seeds:
+        rng = random.Random(seed)
+        state = rules.initial_state()
+        latencies = []
+        moves = 0
+        gameStart = time.perf_counter()
+        while not rules.over(state):
+            if players[rules.player(state)] == "ai" and moves >= opening:
+                start = time.perf_counter()
+                action = rules.ai_action(state)
+                latencies.append(time.perf_counter() - start)
+            else:
+                action = rng.choice(rules.actions(state))
+            state = rules.result(state, action)
+            moves += 1
+        games.append((rules.winner(state), moves, time.perf_counter() - gameStart, latencies))
+    return games
+
+
+def summarize(rules, games):
+    """
+    Returns the statistics of a list of play_games results.
+    """
+    winners = [winner for winner, _, _, _ in games]
+    moves = sum(count for _, count, _, _ in games)
+    seconds = sum(duration for _, _, duration, _ in games)
+    latencies = [latency for _, _, _, gameLatencies in games for latency in gameLatencies]
+    summary = {"games": len(games)}
+    for countKey, _, winner in rules.outcomes:
+        summary[countKey] = winners.count(winner)
+    for _, rateKey, winner in rules.outcomes:
+        summary[rateKey] = winners.count(winner) / len(games)
+    summary["moves"] = moves
+    summary["moves_per_second"] = moves / seconds if seconds else None
+    summary["ai_moves"] = len(latencies)
+    if len(latencies) >= 2:
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+        summary["ai_latency_ms"] = {
+            "mean": 1000 * statistics.mean(latencies),
+            "p50": 1000 * cuts[49], "p90": 1000 * cuts[89],
+            "p99": 1000 * cuts[98], "max": 1000 * max(latencies)
+        }
+    return summary
+
+
+def code_version():
+    """
+    Returns the commit checked out, None outside of a git repository.
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_game(game):
+    """
+    Returns the tournament module of game, imported from its folder.
+    """
+    folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), GAMES[game])
+    sys.path.insert(0, folder)
+    return importlib.import_module("tournament")
+
+
+def argument_parser(game):
+    """
+    Returns a parser of the arguments every tournament takes.
+    """
+    argParser = argparse.ArgumentParser(prog=f"harness.py {game}")
+    argParser.add_argument("--games", type=int, default=1000,
+                           help="games of every match up")
+    argParser.add_argument("--workers", type=int, default=None)
+    argParser.add_argument("--seed", type=int, default=0)
+    argParser.add_argument("--output", help="write the JSON here instead of stdout")
+    return argParser
+
+
+def new_report(rules, seed):
+    return {
+        "game": rules.name,
+        "commit": code_version(),
+        "python": platform.python_version(),
+        "seed": seed,
+        "ai_vs_ai_opening_moves": OPENING
+    }
+
+
+def run(rules, report, args, initializer=None, initargs=()):
+    """
+    Plays args.games games of every match up and adds their statistics
+    to report. The worker processes are started with initializer.
+    """
+    report["matches"] = {}
+    start = time.perf_counter()
+    with ProcessPoolExecutor(args.workers, initializer=initializer,
+                             initargs=initargs) as executor:
+        for number, match in enumerate(MATCHES):
+            seeds = [args.seed * len(MATCHES) * args.games + number * args.games + game
+                     for game in range(args.games)]
+            chunks = [seeds[i:i + CHUNK] for i in range(0, len(seeds), CHUNK)]
+            games = [game for chunk in executor.map(play_games, [rules] * len(chunks),
+                                                    [match] * len(chunks), chunks)
+                     for game in chunk]
+            report["matches"][match] = summarize(rules, games)
+    report["seconds"] = time.perf_counter() - start
+
+
+def write_report(rules, report, output):
+    """
+    Prints report as JSON, or writes it to output and prints a summary.
+    """
+    out = json.dumps(report, indent=2)
+    if output is None:
+        print(out)
+        return
+    with open(output, "w") as f:
+        f.write(out + "\n")
+    for match, summary in report["matches"].items():
+        counts = ", ".join(f"{countKey} {summary[countKey]}"
+                           for countKey, _, _ in rules.outcomes)
+        print(f"{match}: {counts}, {summary['moves_per_second']:.0f} moves/s",
+              file=sys.stderr)
+
+
+def main():
+    gameParser = argparse.ArgumentParser(add_help=False)
+    gameParser.add_argument("game", choices=GAMES)
+    gameArgs, rest = gameParser.parse_known_args()
+
+    tournament = load_game(gameArgs.game)
+    argParser = argument_parser(gameArgs.game)
+    tournament.add_arguments(argParser)
+    args = argParser.parse_args(rest)
+
+    rules = tournament.Rules()
+    report = new_report(rules, args.seed)
+    initializer, initargs = tournament.prepare(args, report)
+    run(rules, report, args, initializer, initargs)
+    write_report(rules, report, args.output)
+
+
+if __name__ == "__main__":
+    main()